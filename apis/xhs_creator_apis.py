@@ -1,12 +1,13 @@
-import requests
-from xhs_utils.cookie_util import trans_cookies
+from xhs_utils import json_util
+from xhs_utils.http_util import HttpTransport
 from xhs_utils.xhs_creator_util import get_common_headers, generate_xs, splice_str
-from xhs_utils.xhs_util import generate_x_b3_traceid
+from xhs_utils.xhs_util import generate_x_b3_traceid, get_session
 
 
 class XHS_Creator_Apis():
-    def __init__(self):
+    def __init__(self, pool_connections=10, pool_maxsize=20, transport: HttpTransport = None):
         self.base_url = "https://edith.xiaohongshu.com"
+        self.transport = transport or HttpTransport(pool_connections, pool_maxsize)
 
 
     # page: 页数
@@ -25,11 +26,12 @@ class XHS_Creator_Apis():
                 params["page"] = str(page)
             splice_api = splice_str(api, params)
             headers = get_common_headers()
-            cookies = trans_cookies(cookies_str)
-            xs, xt, _ = generate_xs(cookies['a1'], splice_api, '')
+            session = get_session(cookies_str)
+            cookies = session.cookies
+            xs, xt, _ = generate_xs(session.a1, splice_api, '')
             headers['x-s'], headers['x-t'] = xs, str(xt)
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, verify=False)
-            res_json = response.json()
+            response = self.transport.get(self.base_url + splice_api, headers=headers, cookies=cookies, verify=False)
+            res_json = json_util.loads(response.content)
             success = res_json["success"]
         except Exception as e:
             success, msg = False, str(e)
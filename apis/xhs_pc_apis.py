@@ -1,30 +1,131 @@
 # encoding: utf-8
 import json
+import os
 import re
+import time
 import urllib
-import requests
-from xhs_utils.xhs_util import splice_str, generate_request_params, generate_x_b3_traceid, get_common_headers
+from concurrent.futures import ThreadPoolExecutor
+from xhs_utils import json_util
+from xhs_utils.budget_util import Budget
+from xhs_utils.cache_util import ResponseCache
+from xhs_utils.cookie_pool import CookiePool
+from xhs_utils.http_util import HttpTransport, Http2Transport
+from xhs_utils.proxy_pool import ProxyPool
+from xhs_utils.rate_limit_util import RateLimiter
+from xhs_utils.request_util import RetryPolicy, XhsRiskError, execute
+from xhs_utils.singleflight_util import SingleFlight, make_key
+from xhs_utils.xhs_util import splice_str, get_session, generate_request_params, generate_x_b3_traceid, get_common_headers, PreSignQueue
 from loguru import logger
 
 """
     获小红书的api
-    :param cookies_str: 你的cookies
+    :param cookies_str: 你的cookies, 也可以传入 xhs_utils.xhs_util.XhsSession, 每次请求不再重复解析cookies
+                        或者传入 xhs_utils.cookie_pool.CookiePool, 每个请求从账号池里挑一个账号, 命中风控的账号自动隔离
+    :param proxies: 各方法的代理, requests 格式的字典, 或者 xhs_utils.proxy_pool.ProxyPool, 按成功率和延迟给每个请求挑代理
+    :param pool_connections: 每组代理缓存的host连接池数量
+    :param pool_maxsize: 每个host保持的最大keep-alive连接数, 多线程调用时设置为线程数
+    :param transport: 自定义的 HttpTransport, 多个实例可以共用一个连接池
+    :param http2: 使用 HTTP/2 多路复用连接 (Http2Transport), 默认读取环境变量 XHS_HTTP2, 协商结果见 self.transport.stats()
+    :param retry_policy: 超时和重试策略 RetryPolicy, 默认连接超时5秒, 读取超时15秒, 网络错误和5xx最多重试3次
+    :param rate_limiter: 按账号/接口族限速的 RateLimiter, 默认读取环境变量 XHS_RATE_LIMIT, 多个实例可以共用
+    :param cache: 笔记详情/用户信息/频道/搜索联想的响应缓存 ResponseCache, 默认读取环境变量 XHS_CACHE / XHS_CACHE_PATH, 传 False 不缓存
 """
 class XHS_Apis():
-    def __init__(self):
+    def __init__(self, pool_connections=10, pool_maxsize=20, transport: HttpTransport = None, http2: bool = None, retry_policy: RetryPolicy = None, rate_limiter: RateLimiter = None, cache: ResponseCache = None):
         self.base_url = "https://edith.xiaohongshu.com"
+        if http2 is None:
+            http2 = bool(os.getenv('XHS_HTTP2'))
+        if transport is None:
+            transport = Http2Transport(max_connections=pool_maxsize, max_keepalive_connections=pool_maxsize) if http2 else HttpTransport(pool_connections, pool_maxsize)
+        self.transport = transport
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.rate_limiter = rate_limiter or RateLimiter.from_env()
+        if cache is None:
+            cache = ResponseCache.from_env()
+        self.cache = cache or None
+        self.singleflight = SingleFlight()
 
-    def get_homefeed_all_channel(self, cookies_str: str, proxies: dict = None):
+    def _request(self, method: str, api: str, cookies_str: str, data='', proxies: dict = None, request_params: tuple = None):
+        """
+            签名并发送请求, 返回解析后的json
+            同一账号同时发出的相同请求只发一次, 共用结果, 见 _send_request
+        """
+        account = id(cookies_str) if isinstance(cookies_str, CookiePool) else get_session(cookies_str).a1
+        return self.singleflight.do(make_key(method, api, account, data), self._send_request, method, api, cookies_str, data, proxies, request_params)
+
+    def _send_request(self, method: str, api: str, cookies_str: str, data='', proxies: dict = None, request_params: tuple = None):
+        """
+            实际签名并发送请求, 返回解析后的json
+            每次发送前先从 rate_limiter 拿到该账号和接口族的令牌
+            网络错误和 5xx 按 retry_policy 退避重试, 每次重试重新签名; 命中风控状态码抛 XhsRiskError
+            :param request_params: 预先签好的 (headers, cookies, data), 只用于第一次请求
+            cookies_str 为 CookiePool 时从池里挑一个账号, 命中风控或登录失效时隔离该账号
+            proxies 为 ProxyPool 时每次发送都从池里挑一个代理, 并记录这个代理的结果和延迟
+        """
+        cookie_pool = cookies_str if isinstance(cookies_str, CookiePool) else None
+        if cookie_pool is not None:
+            cookies_str = cookie_pool.acquire()
+        account = get_session(cookies_str).a1
+
+        def send(attempt, timeout):
+            if attempt or request_params is None:
+                headers, cookies, trans_data = generate_request_params(cookies_str, api, data, method)
+            else:
+                headers, cookies, trans_data = request_params
+            if method == 'GET':
+                return self._transport_request('GET', self.base_url + api, proxies, account, headers=headers, cookies=cookies, timeout=timeout)
+            return self._transport_request('POST', self.base_url + api, proxies, account, headers=headers, data=trans_data.encode('utf-8'), cookies=cookies, timeout=timeout)
+        try:
+            res_json = json_util.loads(execute(send, self.retry_policy, lambda: self.rate_limiter.acquire(account, api)).content)
+        except XhsRiskError as e:
+            if cookie_pool is not None:
+                cookie_pool.quarantine(cookies_str, str(e))
+            raise
+        if cookie_pool is not None:
+            cookie_pool.check_response(cookies_str, res_json)
+        return res_json
+
+    def _transport_request(self, method: str, url: str, proxies, account: str = None, **kwargs):
+        """
+            通过 self.transport 发出一次请求
+            proxies 为 ProxyPool 时从池里挑一个代理, 并记录这个代理的结果和延迟
+        """
+        proxy_pool = proxies if isinstance(proxies, ProxyPool) else None
+        proxy = proxy_pool.acquire(account) if proxy_pool is not None else None
+        start = time.monotonic()
+        try:
+            response = self.transport.request(method, url, proxy.proxies if proxy is not None else proxies, **kwargs)
+        except Exception:
+            if proxy is not None:
+                proxy_pool.report(proxy)
+            raise
+        if proxy is not None:
+            proxy_pool.report(proxy, response.status_code, time.monotonic() - start)
+        return response
+
+    def _cached_request(self, endpoint: str, key: str, use_cache: bool, method: str, api: str, cookies_str: str, data='', proxies: dict = None):
+        """
+            带缓存的 _request, 命中缓存时不发请求, 成功的响应按 self.cache 中该接口的缓存时间写入缓存
+        """
+        if use_cache and self.cache is not None:
+            res_json = self.cache.get(endpoint, key)
+            if res_json is not None:
+                return res_json
+        res_json = self._request(method, api, cookies_str, data, proxies)
+        if self.cache is not None:
+            self.cache.set(endpoint, key, res_json)
+        return res_json
+
+    def get_homefeed_all_channel(self, cookies_str: str, proxies: dict = None, use_cache=True):
         """
             获取主页的所有频道
             返回主页的所有频道
+            :param use_cache: 为 False 时跳过缓存直接请求, 结果仍然写入缓存
         """
         res_json = None
         try:
             api = "/api/sns/web/v1/homefeed/category"
-            headers, cookies, data = generate_request_params(cookies_str, api, '', 'GET')
-            response = requests.get(self.base_url + api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._cached_request('get_homefeed_all_channel', '', use_cache, 'GET', api, cookies_str, '', proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
@@ -62,52 +163,54 @@ class XHS_Apis():
                 ],
                 "need_filter_image": False
             }
-            headers, cookies, trans_data = generate_request_params(cookies_str, api, data, 'POST')
-            response = requests.post(self.base_url + api, headers=headers, data=trans_data, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('POST', api, cookies_str, data, proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
             msg = str(e)
         return success, msg, res_json
 
-    def get_homefeed_recommend_by_num(self, category, require_num, cookies_str: str, proxies: dict = None):
+    def iter_homefeed_recommend(self, category, cookies_str: str, proxies: dict = None, cursor: tuple = None):
+        """
+            逐页获取主页推荐的笔记, 每拿到一页 yield 一次 (notes, cursor, has_more), 不在内存里攒全部结果
+            :param category: 你想要获取的频道
+            :param cookies_str: 你的cookies
+            :param cursor: (cursor_score, note_index), 传入上次 yield 的 cursor 可以接着翻
+            请求失败时抛出异常
+        """
+        cursor_score, note_index = cursor or ("", 0)
+        refresh_type = 3 if cursor_score else 1
+        while True:
+            success, msg, res_json = self.get_homefeed_recommend(category, cursor_score, refresh_type, note_index, cookies_str, proxies)
+            if not success:
+                raise Exception(msg)
+            if "items" not in res_json["data"]:
+                return
+            notes = res_json["data"]["items"]
+            cursor_score = res_json["data"]["cursor_score"]
+            refresh_type = 3
+            note_index += 20
+            yield notes, (cursor_score, note_index), True
+
+    def get_homefeed_recommend_by_num(self, category, require_num, cookies_str: str, proxies: dict = None, deadline: float = None, max_pages: int = None):
         """
             根据数量获取主页推荐的笔记
             :param category: 你想要获取的频道
             :param require_num: 你想要获取的笔记的数量
             :param cookies_str: 你的cookies
+            :param deadline: 时间预算(秒), 用完后返回已经拿到的部分结果
+            :param max_pages: 最多请求的页数
             根据数量返回主页推荐的笔记
         """
-        cursor_score, refresh_type, note_index = "", 1, 0
-        note_list = []
-        try:
-            while True:
-                success, msg, res_json = self.get_homefeed_recommend(category, cursor_score, refresh_type, note_index, cookies_str, proxies)
-                if not success:
-                    raise Exception(msg)
-                if "items" not in res_json["data"]:
-                    break
-                notes = res_json["data"]["items"]
-                note_list.extend(notes)
-                cursor_score = res_json["data"]["cursor_score"]
-                refresh_type = 3
-                note_index += 20
-                if len(note_list) > require_num:
-                    break
-        except Exception as e:
-            success = False
-            msg = str(e)
-        if len(note_list) > require_num:
-            note_list = note_list[:require_num]
-        return success, msg, note_list
+        return Budget(deadline, max_pages).collect(self.iter_homefeed_recommend(category, cookies_str, proxies), require_num)
 
-    def get_user_info(self, user_id: str, cookies_str: str, proxies: dict = None):
+    def get_user_info(self, user_id: str, cookies_str: str, proxies: dict = None, use_cache=True):
         """
             获取用户的信息
             :param user_id: 你想要获取的用户的id
             :param cookies_str: 你的cookies
             返回用户的信息
+            :param use_cache: 为 False 时跳过缓存直接请求, 结果仍然写入缓存
         """
         res_json = None
         try:
@@ -116,9 +219,7 @@ class XHS_Apis():
                 "target_user_id": user_id
             }
             splice_api = splice_str(api, params)
-            headers, cookies, data = generate_request_params(cookies_str, splice_api, '', 'GET')
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._cached_request('get_user_info', user_id, use_cache, 'GET', splice_api, cookies_str, '', proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
@@ -134,9 +235,7 @@ class XHS_Apis():
         res_json = None
         try:
             api = f"/api/sns/web/v1/user/selfinfo"
-            headers, cookies, data = generate_request_params(cookies_str, api, '', 'GET')
-            response = requests.get(self.base_url + api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('GET', api, cookies_str, '', proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
@@ -153,9 +252,7 @@ class XHS_Apis():
         res_json = None
         try:
             api = f"/api/sns/web/v2/user/me"
-            headers, cookies, data = generate_request_params(cookies_str, api, '', 'GET')
-            response = requests.get(self.base_url + api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('GET', api, cookies_str, '', proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
@@ -182,9 +279,7 @@ class XHS_Apis():
                 "xsec_source": xsec_source,
             }
             splice_api = splice_str(api, params)
-            headers, cookies, data = generate_request_params(cookies_str, splice_api, '', 'GET')
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('GET', splice_api, cookies_str, '', proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
@@ -192,38 +287,44 @@ class XHS_Apis():
         return success, msg, res_json
 
 
-    def get_user_all_notes(self, user_url: str, cookies_str: str, proxies: dict = None):
+    def iter_user_all_notes(self, user_url: str, cookies_str: str, proxies: dict = None, cursor: str = ''):
+        """
+            逐页获取用户的笔记, 每拿到一页 yield 一次 (notes, cursor, has_more), 不在内存里攒全部结果
+            :param user_url: 用户主页的url
+            :param cookies_str: 你的cookies
+            :param cursor: 开始翻页的位置, 传入上次 yield 的 cursor 可以接着翻
+            请求失败时抛出异常
+        """
+        urlParse = urllib.parse.urlparse(user_url)
+        user_id = urlParse.path.split("/")[-1]
+        kvs = urlParse.query.split('&')
+        kvDist = {kv.split('=')[0]: kv.split('=')[1] for kv in kvs}
+        xsec_token = kvDist['xsec_token'] if 'xsec_token' in kvDist else ""
+        xsec_source = kvDist['xsec_source'] if 'xsec_source' in kvDist else "pc_search"
+        while True:
+            success, msg, res_json = self.get_user_note_info(user_id, cursor, cookies_str, xsec_token, xsec_source, proxies)
+            if not success:
+                raise Exception(msg)
+            if 'cursor' not in res_json["data"]:
+                return
+            notes = res_json["data"]["notes"]
+            cursor = str(res_json["data"]["cursor"])
+            has_more = len(notes) > 0 and res_json["data"]["has_more"]
+            yield notes, cursor, has_more
+            if not has_more:
+                return
+
+    def get_user_all_notes(self, user_url: str, cookies_str: str, proxies: dict = None, deadline: float = None, max_pages: int = None, max_items: int = None):
         """
            获取用户所有笔记
            :param user_id: 你想要获取的用户的id
            :param cookies_str: 你的cookies
+           :param deadline: 时间预算(秒), 用完后返回已经拿到的部分结果
+           :param max_pages: 最多请求的页数
+           :param max_items: 最多返回的条数
            返回用户的所有笔记
         """
-        cursor = ''
-        note_list = []
-        try:
-            urlParse = urllib.parse.urlparse(user_url)
-            user_id = urlParse.path.split("/")[-1]
-            kvs = urlParse.query.split('&')
-            kvDist = {kv.split('=')[0]: kv.split('=')[1] for kv in kvs}
-            xsec_token = kvDist['xsec_token'] if 'xsec_token' in kvDist else ""
-            xsec_source = kvDist['xsec_source'] if 'xsec_source' in kvDist else "pc_search"
-            while True:
-                success, msg, res_json = self.get_user_note_info(user_id, cursor, cookies_str, xsec_token, xsec_source, proxies)
-                if not success:
-                    raise Exception(msg)
-                notes = res_json["data"]["notes"]
-                if 'cursor' in res_json["data"]:
-                    cursor = str(res_json["data"]["cursor"])
-                else:
-                    break
-                note_list.extend(notes)
-                if len(notes) == 0 or not res_json["data"]["has_more"]:
-                    break
-        except Exception as e:
-            success = False
-            msg = str(e)
-        return success, msg, note_list
+        return Budget(deadline, max_pages, max_items).collect(self.iter_user_all_notes(user_url, cookies_str, proxies))
 
     def get_user_like_note_info(self, user_id: str, cursor: str, cookies_str: str, xsec_token='', xsec_source='', proxies: dict = None):
         """
@@ -245,48 +346,51 @@ class XHS_Apis():
                 "xsec_source": xsec_source,
             }
             splice_api = splice_str(api, params)
-            headers, cookies, data = generate_request_params(cookies_str, splice_api, '', 'GET')
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('GET', splice_api, cookies_str, '', proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
             msg = str(e)
         return success, msg, res_json
 
-    def get_user_all_like_note_info(self, user_url: str, cookies_str: str, proxies: dict = None):
+    def iter_user_all_like_note_info(self, user_url: str, cookies_str: str, proxies: dict = None, cursor: str = ''):
+        """
+            逐页获取用户喜欢的笔记, 每拿到一页 yield 一次 (notes, cursor, has_more), 不在内存里攒全部结果
+            :param user_url: 用户主页的url
+            :param cookies_str: 你的cookies
+            :param cursor: 开始翻页的位置, 传入上次 yield 的 cursor 可以接着翻
+            请求失败时抛出异常
+        """
+        urlParse = urllib.parse.urlparse(user_url)
+        user_id = urlParse.path.split("/")[-1]
+        kvs = urlParse.query.split('&')
+        kvDist = {kv.split('=')[0]: kv.split('=')[1] for kv in kvs}
+        xsec_token = kvDist['xsec_token'] if 'xsec_token' in kvDist else ""
+        xsec_source = kvDist['xsec_source'] if 'xsec_source' in kvDist else "pc_user"
+        while True:
+            success, msg, res_json = self.get_user_like_note_info(user_id, cursor, cookies_str, xsec_token, xsec_source, proxies)
+            if not success:
+                raise Exception(msg)
+            if 'cursor' not in res_json["data"]:
+                return
+            notes = res_json["data"]["notes"]
+            cursor = str(res_json["data"]["cursor"])
+            has_more = len(notes) > 0 and res_json["data"]["has_more"]
+            yield notes, cursor, has_more
+            if not has_more:
+                return
+
+    def get_user_all_like_note_info(self, user_url: str, cookies_str: str, proxies: dict = None, deadline: float = None, max_pages: int = None, max_items: int = None):
         """
             获取用户所有喜欢笔记
             :param user_id: 你想要获取的用户的id
             :param cookies_str: 你的cookies
+            :param deadline: 时间预算(秒), 用完后返回已经拿到的部分结果
+            :param max_pages: 最多请求的页数
+            :param max_items: 最多返回的条数
             返回用户的所有喜欢笔记
         """
-        cursor = ''
-        note_list = []
-        try:
-            urlParse = urllib.parse.urlparse(user_url)
-            user_id = urlParse.path.split("/")[-1]
-            kvs = urlParse.query.split('&')
-            kvDist = {kv.split('=')[0]: kv.split('=')[1] for kv in kvs}
-            xsec_token = kvDist['xsec_token'] if 'xsec_token' in kvDist else ""
-            xsec_source = kvDist['xsec_source'] if 'xsec_source' in kvDist else "pc_user"
-            while True:
-                success, msg, res_json = self.get_user_like_note_info(user_id, cursor, cookies_str, xsec_token,
-                                                                      xsec_source, proxies)
-                if not success:
-                    raise Exception(msg)
-                notes = res_json["data"]["notes"]
-                if 'cursor' in res_json["data"]:
-                    cursor = str(res_json["data"]["cursor"])
-                else:
-                    break
-                note_list.extend(notes)
-                if len(notes) == 0 or not res_json["data"]["has_more"]:
-                    break
-        except Exception as e:
-            success = False
-            msg = str(e)
-        return success, msg, note_list
+        return Budget(deadline, max_pages, max_items).collect(self.iter_user_all_like_note_info(user_url, cookies_str, proxies))
 
     def get_user_collect_note_info(self, user_id: str, cursor: str, cookies_str: str, xsec_token='', xsec_source='', proxies: dict = None):
         """
@@ -308,56 +412,60 @@ class XHS_Apis():
                 "xsec_source": xsec_source,
             }
             splice_api = splice_str(api, params)
-            headers, cookies, data = generate_request_params(cookies_str, splice_api, '', 'GET')
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('GET', splice_api, cookies_str, '', proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
             msg = str(e)
         return success, msg, res_json
 
-    def get_user_all_collect_note_info(self, user_url: str, cookies_str: str, proxies: dict = None):
+    def iter_user_all_collect_note_info(self, user_url: str, cookies_str: str, proxies: dict = None, cursor: str = ''):
+        """
+            逐页获取用户收藏的笔记, 每拿到一页 yield 一次 (notes, cursor, has_more), 不在内存里攒全部结果
+            :param user_url: 用户主页的url
+            :param cookies_str: 你的cookies
+            :param cursor: 开始翻页的位置, 传入上次 yield 的 cursor 可以接着翻
+            请求失败时抛出异常
+        """
+        urlParse = urllib.parse.urlparse(user_url)
+        user_id = urlParse.path.split("/")[-1]
+        kvs = urlParse.query.split('&')
+        kvDist = {kv.split('=')[0]: kv.split('=')[1] for kv in kvs}
+        xsec_token = kvDist['xsec_token'] if 'xsec_token' in kvDist else ""
+        xsec_source = kvDist['xsec_source'] if 'xsec_source' in kvDist else "pc_search"
+        while True:
+            success, msg, res_json = self.get_user_collect_note_info(user_id, cursor, cookies_str, xsec_token, xsec_source, proxies)
+            if not success:
+                raise Exception(msg)
+            if 'cursor' not in res_json["data"]:
+                return
+            notes = res_json["data"]["notes"]
+            cursor = str(res_json["data"]["cursor"])
+            has_more = len(notes) > 0 and res_json["data"]["has_more"]
+            yield notes, cursor, has_more
+            if not has_more:
+                return
+
+    def get_user_all_collect_note_info(self, user_url: str, cookies_str: str, proxies: dict = None, deadline: float = None, max_pages: int = None, max_items: int = None):
         """
             获取用户所有收藏笔记
             :param user_id: 你想要获取的用户的id
             :param cookies_str: 你的cookies
+            :param deadline: 时间预算(秒), 用完后返回已经拿到的部分结果
+            :param max_pages: 最多请求的页数
+            :param max_items: 最多返回的条数
             返回用户的所有收藏笔记
         """
-        cursor = ''
-        note_list = []
-        try:
-            urlParse = urllib.parse.urlparse(user_url)
-            user_id = urlParse.path.split("/")[-1]
-            kvs = urlParse.query.split('&')
-            kvDist = {kv.split('=')[0]: kv.split('=')[1] for kv in kvs}
-            xsec_token = kvDist['xsec_token'] if 'xsec_token' in kvDist else ""
-            xsec_source = kvDist['xsec_source'] if 'xsec_source' in kvDist else "pc_search"
-            while True:
-                success, msg, res_json = self.get_user_collect_note_info(user_id, cursor, cookies_str, xsec_token,
-                                                                         xsec_source, proxies)
-                if not success:
-                    raise Exception(msg)
-                notes = res_json["data"]["notes"]
-                if 'cursor' in res_json["data"]:
-                    cursor = str(res_json["data"]["cursor"])
-                else:
-                    break
-                note_list.extend(notes)
-                if len(notes) == 0 or not res_json["data"]["has_more"]:
-                    break
-        except Exception as e:
-            success = False
-            msg = str(e)
-        return success, msg, note_list
+        return Budget(deadline, max_pages, max_items).collect(self.iter_user_all_collect_note_info(user_url, cookies_str, proxies))
 
-    def get_note_info(self, url: str, cookies_str: str, proxies: dict = None):
+    def get_note_info(self, url: str, cookies_str: str, proxies: dict = None, use_cache=True):
         """
             获取笔记的详细
             :param url: 你想要获取的笔记的url
             :param cookies_str: 你的cookies
             :param xsec_source: 你的xsec_source 默认为pc_search pc_user pc_feed
             返回笔记的详细
+            :param use_cache: 为 False 时跳过缓存直接请求, 结果仍然写入缓存
         """
         res_json = None
         try:
@@ -379,9 +487,7 @@ class XHS_Apis():
                 "xsec_source": kvDist['xsec_source'] if 'xsec_source' in kvDist else "pc_search",
                 "xsec_token": kvDist['xsec_token']
             }
-            headers, cookies, data = generate_request_params(cookies_str, api, data, 'POST')
-            response = requests.post(self.base_url + api, headers=headers, data=data, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._cached_request('get_note_info', note_id, use_cache, 'POST', api, cookies_str, data, proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
@@ -389,12 +495,13 @@ class XHS_Apis():
         return success, msg, res_json
 
 
-    def get_search_keyword(self, word: str, cookies_str: str, proxies: dict = None):
+    def get_search_keyword(self, word: str, cookies_str: str, proxies: dict = None, use_cache=True):
         """
             获取搜索关键词
             :param word: 你的关键词
             :param cookies_str: 你的cookies
             返回搜索关键词
+            :param use_cache: 为 False 时跳过缓存直接请求, 结果仍然写入缓存
         """
         res_json = None
         try:
@@ -403,29 +510,18 @@ class XHS_Apis():
                 "keyword": urllib.parse.quote(word)
             }
             splice_api = splice_str(api, params)
-            headers, cookies, data = generate_request_params(cookies_str, splice_api, '', 'GET')
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._cached_request('get_search_keyword', word, use_cache, 'GET', splice_api, cookies_str, '', proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
             msg = str(e)
         return success, msg, res_json
 
-    def search_note(self, query: str, cookies_str: str, page=1, sort_type_choice=0, note_type=0, note_time=0, note_range=0, pos_distance=0, geo="", proxies: dict = None):
+    @staticmethod
+    def get_search_note_data(query: str, page=1, sort_type_choice=0, note_type=0, note_time=0, note_range=0, pos_distance=0, geo=""):
         """
-            获取搜索笔记的结果
-            :param query 搜索的关键词
-            :param cookies_str 你的cookies
-            :param page 搜索的页数
-            :param sort_type_choice 排序方式 0 综合排序, 1 最新, 2 最多点赞, 3 最多评论, 4 最多收藏
-            :param note_type 笔记类型 0 不限, 1 视频笔记, 2 普通笔记
-            :param note_time 笔记时间 0 不限, 1 一天内, 2 一周内天, 3 半年内
-            :param note_range 笔记范围 0 不限, 1 已看过, 2 未看过, 3 已关注
-            :param pos_distance 位置距离 0 不限, 1 同城, 2 附近 指定这个必须要指定 geo
-            返回搜索的结果
+            构造搜索笔记的请求体, 参数与 search_note 一致
         """
-        res_json = None
         sort_type = "general"
         if sort_type_choice == 1:
             sort_type = "time_descending"
@@ -461,65 +557,111 @@ class XHS_Apis():
             filter_pos_distance = "附近"
         if geo:
             geo = json.dumps(geo, separators=(',', ':'))
+        data = {
+            "keyword": query,
+            "page": page,
+            "page_size": 20,
+            "search_id": generate_x_b3_traceid(21),
+            "sort": "general",
+            "note_type": 0,
+            "ext_flags": [],
+            "filters": [
+                {
+                    "tags": [
+                        sort_type
+                    ],
+                    "type": "sort_type"
+                },
+                {
+                    "tags": [
+                        filter_note_type
+                    ],
+                    "type": "filter_note_type"
+                },
+                {
+                    "tags": [
+                        filter_note_time
+                    ],
+                    "type": "filter_note_time"
+                },
+                {
+                    "tags": [
+                        filter_note_range
+                    ],
+                    "type": "filter_note_range"
+                },
+                {
+                    "tags": [
+                        filter_pos_distance
+                    ],
+                    "type": "filter_pos_distance"
+                }
+            ],
+            "geo": geo,
+            "image_formats": [
+                "jpg",
+                "webp",
+                "avif"
+            ]
+        }
+        return data
+
+    def search_note(self, query: str, cookies_str: str, page=1, sort_type_choice=0, note_type=0, note_time=0, note_range=0, pos_distance=0, geo="", proxies: dict = None, request_params: tuple = None):
+        """
+            获取搜索笔记的结果
+            :param query 搜索的关键词
+            :param cookies_str 你的cookies
+            :param page 搜索的页数
+            :param sort_type_choice 排序方式 0 综合排序, 1 最新, 2 最多点赞, 3 最多评论, 4 最多收藏
+            :param note_type 笔记类型 0 不限, 1 视频笔记, 2 普通笔记
+            :param note_time 笔记时间 0 不限, 1 一天内, 2 一周内天, 3 半年内
+            :param note_range 笔记范围 0 不限, 1 已看过, 2 未看过, 3 已关注
+            :param pos_distance 位置距离 0 不限, 1 同城, 2 附近 指定这个必须要指定 geo
+            :param request_params 预先签好的 (headers, cookies, data), 为空时现场签名
+            返回搜索的结果
+        """
+        res_json = None
         try:
             api = "/api/sns/web/v1/search/notes"
-            data = {
-                "keyword": query,
-                "page": page,
-                "page_size": 20,
-                "search_id": generate_x_b3_traceid(21),
-                "sort": "general",
-                "note_type": 0,
-                "ext_flags": [],
-                "filters": [
-                    {
-                        "tags": [
-                            sort_type
-                        ],
-                        "type": "sort_type"
-                    },
-                    {
-                        "tags": [
-                            filter_note_type
-                        ],
-                        "type": "filter_note_type"
-                    },
-                    {
-                        "tags": [
-                            filter_note_time
-                        ],
-                        "type": "filter_note_time"
-                    },
-                    {
-                        "tags": [
-                            filter_note_range
-                        ],
-                        "type": "filter_note_range"
-                    },
-                    {
-                        "tags": [
-                            filter_pos_distance
-                        ],
-                        "type": "filter_pos_distance"
-                    }
-                ],
-                "geo": geo,
-                "image_formats": [
-                    "jpg",
-                    "webp",
-                    "avif"
-                ]
-            }
-            headers, cookies, data = generate_request_params(cookies_str, api, data, 'POST')
-            response = requests.post(self.base_url + api, headers=headers, data=data.encode('utf-8'), cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            data = self.get_search_note_data(query, page, sort_type_choice, note_type, note_time, note_range, pos_distance, geo)
+            res_json = self._request('POST', api, cookies_str, data, proxies, request_params)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
             msg = str(e)
         return success, msg, res_json
 
-    def search_some_note(self, query: str, require_num: int, cookies_str: str, sort_type_choice=0, note_type=0, note_time=0, note_range=0, pos_distance=0, geo="", proxies: dict = None):
+    def iter_search_note(self, query: str, cookies_str: str, sort_type_choice=0, note_type=0, note_time=0, note_range=0, pos_distance=0, geo="", proxies: dict = None, page=1):
+        """
+            逐页搜索笔记, 每拿到一页 yield 一次 (notes, cursor, has_more), cursor 是下一页的页码
+            参数同 search_some_note, page 为开始的页码, 传入上次 yield 的 cursor 可以接着翻
+            请求失败时抛出异常
+        """
+        api = "/api/sns/web/v1/search/notes"
+        # 当前页请求期间提前签好下一页, 账号池每个请求才选账号, 不预签
+        presign_queue = None if isinstance(cookies_str, CookiePool) else PreSignQueue(cookies_str)
+        try:
+            if presign_queue is not None:
+                presign_queue.put([(api, self.get_search_note_data(query, page, sort_type_choice, note_type, note_time, note_range, pos_distance, geo), 'POST')])
+            while True:
+                request_params = None
+                if presign_queue is not None:
+                    presign_queue.put([(api, self.get_search_note_data(query, page + 1, sort_type_choice, note_type, note_time, note_range, pos_distance, geo), 'POST')])
+                    request_params = presign_queue.get()
+                success, msg, res_json = self.search_note(query, cookies_str, page, sort_type_choice, note_type, note_time, note_range, pos_distance, geo, proxies, request_params)
+                if not success:
+                    raise Exception(msg)
+                if "items" not in res_json["data"]:
+                    return
+                page += 1
+                yield res_json["data"]["items"], page, res_json["data"]["has_more"]
+                if not res_json["data"]["has_more"]:
+                    return
+        finally:
+            if presign_queue is not None:
+                presign_queue.close()
+
+    def search_some_note(self, query: str, require_num: int, cookies_str: str, sort_type_choice=0, note_type=0, note_time=0, note_range=0, pos_distance=0, geo="", proxies: dict = None, deadline: float = None, max_pages: int = None):
         """
             指定数量搜索笔记，设置排序方式和笔记类型和笔记数量
             :param query 搜索的关键词
@@ -531,28 +673,12 @@ class XHS_Apis():
             :param note_range 笔记范围 0 不限, 1 已看过, 2 未看过, 3 已关注
             :param pos_distance 位置距离 0 不限, 1 同城, 2 附近 指定这个必须要指定 geo
             :param geo: 定位信息 经纬度
+            :param deadline: 时间预算(秒), 用完后返回已经拿到的部分结果
+            :param max_pages: 最多请求的页数
             返回搜索的结果
         """
-        page = 1
-        note_list = []
-        try:
-            while True:
-                success, msg, res_json = self.search_note(query, cookies_str, page, sort_type_choice, note_type, note_time, note_range, pos_distance, geo, proxies)
-                if not success:
-                    raise Exception(msg)
-                if "items" not in res_json["data"]:
-                    break
-                notes = res_json["data"]["items"]
-                note_list.extend(notes)
-                page += 1
-                if len(note_list) >= require_num or not res_json["data"]["has_more"]:
-                    break
-        except Exception as e:
-            success = False
-            msg = str(e)
-        if len(note_list) > require_num:
-            note_list = note_list[:require_num]
-        return success, msg, note_list
+        pages = self.iter_search_note(query, cookies_str, sort_type_choice, note_type, note_time, note_range, pos_distance, geo, proxies)
+        return Budget(deadline, max_pages).collect(pages, require_num)
 
     def search_user(self, query: str, cookies_str: str, page=1, proxies: dict = None):
         """
@@ -575,43 +701,43 @@ class XHS_Apis():
                     "request_id": "22471139-1723999898524"
                 }
             }
-            headers, cookies, data = generate_request_params(cookies_str, api, data, 'POST')
-            response = requests.post(self.base_url + api, headers=headers, data=data.encode('utf-8'), cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('POST', api, cookies_str, data, proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
             msg = str(e)
         return success, msg, res_json
 
-    def search_some_user(self, query: str, require_num: int, cookies_str: str, proxies: dict = None):
+    def iter_search_user(self, query: str, cookies_str: str, proxies: dict = None, page=1):
+        """
+            逐页搜索用户, 每拿到一页 yield 一次 (users, cursor, has_more), cursor 是下一页的页码
+            :param query 搜索的关键词
+            :param cookies_str 你的cookies
+            :param page 开始的页码, 传入上次 yield 的 cursor 可以接着翻
+            请求失败时抛出异常
+        """
+        while True:
+            success, msg, res_json = self.search_user(query, cookies_str, page, proxies)
+            if not success:
+                raise Exception(msg)
+            if "users" not in res_json["data"]:
+                return
+            page += 1
+            yield res_json["data"]["users"], page, res_json["data"]["has_more"]
+            if not res_json["data"]["has_more"]:
+                return
+
+    def search_some_user(self, query: str, require_num: int, cookies_str: str, proxies: dict = None, deadline: float = None, max_pages: int = None):
         """
             指定数量搜索用户
             :param query 搜索的关键词
             :param require_num 搜索的数量
             :param cookies_str 你的cookies
+            :param deadline: 时间预算(秒), 用完后返回已经拿到的部分结果
+            :param max_pages: 最多请求的页数
             返回搜索的结果
         """
-        page = 1
-        user_list = []
-        try:
-            while True:
-                success, msg, res_json = self.search_user(query, cookies_str, page, proxies)
-                if not success:
-                    raise Exception(msg)
-                if "users" not in res_json["data"]:
-                    break
-                users = res_json["data"]["users"]
-                user_list.extend(users)
-                page += 1
-                if len(user_list) >= require_num or not res_json["data"]["has_more"]:
-                    break
-        except Exception as e:
-            success = False
-            msg = str(e)
-        if len(user_list) > require_num:
-            user_list = user_list[:require_num]
-        return success, msg, user_list
+        return Budget(deadline, max_pages).collect(self.iter_search_user(query, cookies_str, proxies), require_num)
 
     def get_note_out_comment(self, note_id: str, cursor: str, xsec_token: str, cookies_str: str, proxies: dict = None):
         """
@@ -632,41 +758,47 @@ class XHS_Apis():
                 "xsec_token": xsec_token
             }
             splice_api = splice_str(api, params)
-            headers, cookies, data = generate_request_params(cookies_str, splice_api, '', 'GET')
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('GET', splice_api, cookies_str, '', proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
             msg = str(e)
         return success, msg, res_json
 
-    def get_note_all_out_comment(self, note_id: str, xsec_token: str, cookies_str: str, proxies: dict = None):
+    def iter_note_all_out_comment(self, note_id: str, xsec_token: str, cookies_str: str, proxies: dict = None, cursor: str = ''):
+        """
+            逐页获取笔记的一级评论, 每拿到一页 yield 一次 (comments, cursor, has_more), 不在内存里攒全部结果
+            :param note_id 笔记的id
+            :param cookies_str 你的cookies
+            :param cursor 开始翻页的位置, 传入上次 yield 的 cursor 可以接着翻
+            请求失败时抛出异常
+        """
+        count = 0
+        while True:
+            success, msg, res_json = self.get_note_out_comment(note_id, cursor, xsec_token, cookies_str, proxies)
+            if not success:
+                raise Exception(msg)
+            if 'cursor' not in res_json["data"]:
+                return
+            comments = res_json["data"]["comments"]
+            cursor = str(res_json["data"]["cursor"])
+            count += len(comments)
+            has_more = count > 0 and res_json["data"]["has_more"]
+            yield comments, cursor, has_more
+            if not has_more:
+                return
+
+    def get_note_all_out_comment(self, note_id: str, xsec_token: str, cookies_str: str, proxies: dict = None, deadline: float = None, max_pages: int = None, max_items: int = None):
         """
             获取笔记的全部一级评论
             :param note_id 笔记的id
             :param cookies_str 你的cookies
+            :param deadline: 时间预算(秒), 用完后返回已经拿到的部分结果
+            :param max_pages: 最多请求的页数
+            :param max_items: 最多返回的条数
             返回笔记的全部一级评论
         """
-        cursor = ''
-        note_out_comment_list = []
-        try:
-            while True:
-                success, msg, res_json = self.get_note_out_comment(note_id, cursor, xsec_token, cookies_str, proxies)
-                if not success:
-                    raise Exception(msg)
-                comments = res_json["data"]["comments"]
-                if 'cursor' in res_json["data"]:
-                    cursor = str(res_json["data"]["cursor"])
-                else:
-                    break
-                note_out_comment_list.extend(comments)
-                if len(note_out_comment_list) == 0 or not res_json["data"]["has_more"]:
-                    break
-        except Exception as e:
-            success = False
-            msg = str(e)
-        return success, msg, note_out_comment_list
+        return Budget(deadline, max_pages, max_items).collect(self.iter_note_all_out_comment(note_id, xsec_token, cookies_str, proxies))
 
     def get_note_inner_comment(self, comment: dict, cursor: str, xsec_token: str, cookies_str: str, proxies: dict = None):
         """
@@ -689,69 +821,108 @@ class XHS_Apis():
                 "xsec_token": xsec_token
             }
             splice_api = splice_str(api, params)
-            headers, cookies, data = generate_request_params(cookies_str, splice_api, '', 'GET')
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('GET', splice_api, cookies_str, '', proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
             msg = str(e)
         return success, msg, res_json
 
-    def get_note_all_inner_comment(self, comment: dict, xsec_token: str, cookies_str: str, proxies: dict = None):
+    def iter_note_all_inner_comment(self, comment: dict, xsec_token: str, cookies_str: str, proxies: dict = None, cursor: str = None):
         """
-            获取笔记的全部二级评论
+            逐页获取一级评论下的二级评论, 每拿到一页 yield 一次 (comments, cursor, has_more), 不会修改 comment
             :param comment 笔记的一级评论
             :param cookies_str 你的cookies
-            返回笔记的全部二级评论
+            :param cursor 开始翻页的位置, 默认从 comment['sub_comment_cursor'] 开始
+            请求失败时抛出异常
         """
-        try:
+        if cursor is None:
             if not comment['sub_comment_has_more']:
-                return True, 'success', comment
+                return
             cursor = comment['sub_comment_cursor']
-            inner_comment_list = []
-            while True:
-                success, msg, res_json = self.get_note_inner_comment(comment, cursor, xsec_token, cookies_str, proxies)
-                if not success:
-                    raise Exception(msg)
-                comments = res_json["data"]["comments"]
-                if 'cursor' in res_json["data"]:
-                    cursor = str(res_json["data"]["cursor"])
-                else:
-                    break
-                inner_comment_list.extend(comments)
-                if not res_json["data"]["has_more"]:
-                    break
-            comment['sub_comments'].extend(inner_comment_list)
-        except Exception as e:
-            success = False
-            msg = str(e)
+        while True:
+            success, msg, res_json = self.get_note_inner_comment(comment, cursor, xsec_token, cookies_str, proxies)
+            if not success:
+                raise Exception(msg)
+            if 'cursor' not in res_json["data"]:
+                return
+            cursor = str(res_json["data"]["cursor"])
+            yield res_json["data"]["comments"], cursor, res_json["data"]["has_more"]
+            if not res_json["data"]["has_more"]:
+                return
+
+    def get_note_all_inner_comment(self, comment: dict, xsec_token: str, cookies_str: str, proxies: dict = None, deadline: float = None, max_pages: int = None):
+        """
+            获取笔记的全部二级评论
+            :param comment 笔记的一级评论
+            :param cookies_str 你的cookies
+            :param deadline: 时间预算(秒), 用完后返回已经拿到的部分结果
+            :param max_pages: 最多请求的页数
+            返回笔记的全部二级评论
+        """
+        if not comment['sub_comment_has_more']:
+            return True, 'success', comment
+        success, msg, inner_comment_list = Budget(deadline, max_pages).collect(self.iter_note_all_inner_comment(comment, xsec_token, cookies_str, proxies))
+        comment['sub_comments'].extend(inner_comment_list)
+        # 没翻完时记下断点, 之后可以从 sub_comment_cursor 接着翻
+        if inner_comment_list.cursor is not None:
+            comment['sub_comment_cursor'] = inner_comment_list.cursor
+        comment['sub_comment_has_more'] = inner_comment_list.truncated or not success
         return success, msg, comment
 
-    def get_note_all_comment(self, url: str, cookies_str: str, proxies: dict = None):
+    def get_note_all_comment(self, url: str, cookies_str: str, proxies: dict = None, deadline: float = None, max_pages: int = None, max_items: int = None, workers: int = 5):
         """
             获取一篇文章的所有评论
+            一级评论每到一页就开始并发展开这一页的二级评论, 返回的顺序和一级评论的顺序一致
             :param note_id: 你想要获取的笔记的id
             :param cookies_str: 你的cookies
+            :param deadline: 时间预算(秒), 一级评论和二级评论共用, 用完后返回已经拿到的部分结果, 没翻完的二级评论 sub_comment_has_more 为 True
+            :param max_pages: 一级评论最多请求的页数
+            :param max_items: 最多返回的一级评论条数
+            :param workers: 同时展开二级评论的一级评论数, 请求仍然受账号限速约束
             返回一篇文章的所有评论
         """
         out_comment_list = []
+        budget = Budget(deadline)
+        executor = ThreadPoolExecutor(max_workers=workers)
+        futures = []
         try:
             urlParse = urllib.parse.urlparse(url)
             note_id = urlParse.path.split("/")[-1]
             kvs = urlParse.query.split('&')
             kvDist = {kv.split('=')[0]: kv.split('=')[1] for kv in kvs}
-            success, msg, out_comment_list = self.get_note_all_out_comment(note_id, kvDist['xsec_token'], cookies_str, proxies)
+            xsec_token = kvDist['xsec_token']
+
+            def expand(comment):
+                # 开始执行时才计算剩余时间, 排队等待的时间也算在预算里
+                return self.get_note_all_inner_comment(comment, xsec_token, cookies_str, proxies, budget.remaining())
+
+            def submit(pages):
+                count = 0
+                for comments, cursor, has_more in pages:
+                    for comment in comments:
+                        count += 1
+                        if comment['sub_comment_has_more'] and (max_items is None or count <= max_items):
+                            futures.append(executor.submit(expand, comment))
+                    yield comments, cursor, has_more
+
+            pages = submit(self.iter_note_all_out_comment(note_id, xsec_token, cookies_str, proxies))
+            success, msg, out_comment_list = Budget(deadline, max_pages, max_items).collect(pages)
             if not success:
                 raise Exception(msg)
-            for comment in out_comment_list:
-                success, msg, new_comment = self.get_note_all_inner_comment(comment, kvDist['xsec_token'], cookies_str, proxies)
-                if not success:
-                    raise Exception(msg)
+            budget.truncated = out_comment_list.truncated
+            for future in futures:
+                inner_success, inner_msg, comment = future.result()
+                if not inner_success:
+                    raise Exception(inner_msg)
+                if comment['sub_comment_has_more']:
+                    budget.truncated = True
         except Exception as e:
             success = False
             msg = str(e)
-        return success, msg, out_comment_list
+        finally:
+            executor.shutdown(cancel_futures=True)
+        return success, msg, budget.result(out_comment_list, getattr(out_comment_list, 'cursor', None))
 
     def get_unread_message(self, cookies_str: str, proxies: dict = None):
         """
@@ -762,9 +933,7 @@ class XHS_Apis():
         res_json = None
         try:
             api = "/api/sns/web/unread_count"
-            headers, cookies, data = generate_request_params(cookies_str, api, '', 'GET')
-            response = requests.get(self.base_url + api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('GET', api, cookies_str, '', proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
@@ -786,40 +955,41 @@ class XHS_Apis():
                 "cursor": cursor
             }
             splice_api = splice_str(api, params)
-            headers, cookies, data = generate_request_params(cookies_str, splice_api, '', 'GET')
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('GET', splice_api, cookies_str, '', proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
             msg = str(e)
         return success, msg, res_json
 
-    def get_all_metions(self, cookies_str: str, proxies: dict = None):
+    def iter_all_metions(self, cookies_str: str, proxies: dict = None, cursor: str = ''):
+        """
+            逐页获取评论和@提醒, 每拿到一页 yield 一次 (messages, cursor, has_more), 不在内存里攒全部结果
+            :param cookies_str: 你的cookies
+            :param cursor: 开始翻页的位置, 传入上次 yield 的 cursor 可以接着翻
+            请求失败时抛出异常
+        """
+        while True:
+            success, msg, res_json = self.get_metions(cursor, cookies_str, proxies)
+            if not success:
+                raise Exception(msg)
+            if 'cursor' not in res_json["data"]:
+                return
+            cursor = str(res_json["data"]["cursor"])
+            yield res_json["data"]["message_list"], cursor, res_json["data"]["has_more"]
+            if not res_json["data"]["has_more"]:
+                return
+
+    def get_all_metions(self, cookies_str: str, proxies: dict = None, deadline: float = None, max_pages: int = None, max_items: int = None):
         """
             获取全部的评论和@提醒
             :param cookies_str: 你的cookies
+            :param deadline: 时间预算(秒), 用完后返回已经拿到的部分结果
+            :param max_pages: 最多请求的页数
+            :param max_items: 最多返回的条数
             返回全部的评论和@提醒
         """
-        cursor = ''
-        metions_list = []
-        try:
-            while True:
-                success, msg, res_json = self.get_metions(cursor, cookies_str, proxies)
-                if not success:
-                    raise Exception(msg)
-                metions = res_json["data"]["message_list"]
-                if 'cursor' in res_json["data"]:
-                    cursor = str(res_json["data"]["cursor"])
-                else:
-                    break
-                metions_list.extend(metions)
-                if not res_json["data"]["has_more"]:
-                    break
-        except Exception as e:
-            success = False
-            msg = str(e)
-        return success, msg, metions_list
+        return Budget(deadline, max_pages, max_items).collect(self.iter_all_metions(cookies_str, proxies))
 
     def get_likesAndcollects(self, cursor: str, cookies_str: str, proxies: dict = None):
         """
@@ -836,40 +1006,41 @@ class XHS_Apis():
                 "cursor": cursor
             }
             splice_api = splice_str(api, params)
-            headers, cookies, data = generate_request_params(cookies_str, splice_api, '', 'GET')
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('GET', splice_api, cookies_str, '', proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
             msg = str(e)
         return success, msg, res_json
 
-    def get_all_likesAndcollects(self, cookies_str: str, proxies: dict = None):
+    def iter_all_likesAndcollects(self, cookies_str: str, proxies: dict = None, cursor: str = ''):
+        """
+            逐页获取赞和收藏, 每拿到一页 yield 一次 (messages, cursor, has_more), 不在内存里攒全部结果
+            :param cookies_str: 你的cookies
+            :param cursor: 开始翻页的位置, 传入上次 yield 的 cursor 可以接着翻
+            请求失败时抛出异常
+        """
+        while True:
+            success, msg, res_json = self.get_likesAndcollects(cursor, cookies_str, proxies)
+            if not success:
+                raise Exception(msg)
+            if 'cursor' not in res_json["data"]:
+                return
+            cursor = str(res_json["data"]["cursor"])
+            yield res_json["data"]["message_list"], cursor, res_json["data"]["has_more"]
+            if not res_json["data"]["has_more"]:
+                return
+
+    def get_all_likesAndcollects(self, cookies_str: str, proxies: dict = None, deadline: float = None, max_pages: int = None, max_items: int = None):
         """
             获取全部的赞和收藏
             :param cookies_str: 你的cookies
+            :param deadline: 时间预算(秒), 用完后返回已经拿到的部分结果
+            :param max_pages: 最多请求的页数
+            :param max_items: 最多返回的条数
             返回全部的赞和收藏
         """
-        cursor = ''
-        likesAndcollects_list = []
-        try:
-            while True:
-                success, msg, res_json = self.get_likesAndcollects(cursor, cookies_str, proxies)
-                if not success:
-                    raise Exception(msg)
-                likesAndcollects = res_json["data"]["message_list"]
-                if 'cursor' in res_json["data"]:
-                    cursor = str(res_json["data"]["cursor"])
-                else:
-                    break
-                likesAndcollects_list.extend(likesAndcollects)
-                if not res_json["data"]["has_more"]:
-                    break
-        except Exception as e:
-            success = False
-            msg = str(e)
-        return success, msg, likesAndcollects_list
+        return Budget(deadline, max_pages, max_items).collect(self.iter_all_likesAndcollects(cookies_str, proxies))
 
     def get_new_connections(self, cursor: str, cookies_str: str, proxies: dict = None):
         """
@@ -886,55 +1057,58 @@ class XHS_Apis():
                 "cursor": cursor
             }
             splice_api = splice_str(api, params)
-            headers, cookies, data = generate_request_params(cookies_str, splice_api, '', 'GET')
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('GET', splice_api, cookies_str, '', proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
             msg = str(e)
         return success, msg, res_json
 
-    def get_all_new_connections(self, cookies_str: str, proxies: dict = None):
+    def iter_all_new_connections(self, cookies_str: str, proxies: dict = None, cursor: str = ''):
+        """
+            逐页获取新增关注, 每拿到一页 yield 一次 (messages, cursor, has_more), 不在内存里攒全部结果
+            :param cookies_str: 你的cookies
+            :param cursor: 开始翻页的位置, 传入上次 yield 的 cursor 可以接着翻
+            请求失败时抛出异常
+        """
+        while True:
+            success, msg, res_json = self.get_new_connections(cursor, cookies_str, proxies)
+            if not success:
+                raise Exception(msg)
+            if 'cursor' not in res_json["data"]:
+                return
+            cursor = str(res_json["data"]["cursor"])
+            yield res_json["data"]["message_list"], cursor, res_json["data"]["has_more"]
+            if not res_json["data"]["has_more"]:
+                return
+
+    def get_all_new_connections(self, cookies_str: str, proxies: dict = None, deadline: float = None, max_pages: int = None, max_items: int = None):
         """
             获取全部的新增关注
             :param cookies_str: 你的cookies
+            :param deadline: 时间预算(秒), 用完后返回已经拿到的部分结果
+            :param max_pages: 最多请求的页数
+            :param max_items: 最多返回的条数
             返回全部的新增关注
         """
-        cursor = ''
-        connections_list = []
-        try:
-            while True:
-                success, msg, res_json = self.get_new_connections(cursor, cookies_str, proxies)
-                if not success:
-                    raise Exception(msg)
-                connections = res_json["data"]["message_list"]
-                if 'cursor' in res_json["data"]:
-                    cursor = str(res_json["data"]["cursor"])
-                else:
-                    break
-                connections_list.extend(connections)
-                if not res_json["data"]["has_more"]:
-                    break
-        except Exception as e:
-            success = False
-            msg = str(e)
-        return success, msg, connections_list
+        return Budget(deadline, max_pages, max_items).collect(self.iter_all_new_connections(cookies_str, proxies))
 
-    @staticmethod
-    def get_note_no_water_video(note_id):
+    def get_note_no_water_video(self, note_id, proxies: dict = None):
         """
             获取笔记无水印视频
             :param note_id: 你想要获取的笔记的id
+            :param proxies: 代理, 可以是 ProxyPool
             返回笔记无水印视频
+            不需要登录, 按匿名账号限速
         """
         success = True
         msg = '成功'
         video_addr = None
         try:
             headers = get_common_headers()
-            url = f"https://www.xiaohongshu.com/explore/{note_id}"
-            response = requests.get(url, headers=headers)
+            api = f"/explore/{note_id}"
+            url = "https://www.xiaohongshu.com" + api
+            response = execute(lambda attempt, timeout: self._transport_request('GET', url, proxies, headers=headers, timeout=timeout), self.retry_policy, lambda: self.rate_limiter.acquire(None, api))
             res = response.text
             video_addr = re.findall(r'<meta name="og:video" content="(.*?)">', res)[0]
         except Exception as e:
@@ -0,0 +1,1049 @@
+# encoding: utf-8
+import asyncio
+import json
+import os
+import re
+import time
+import urllib
+from apis.xhs_pc_apis import XHS_Apis
+from xhs_utils import json_util
+from xhs_utils.budget_util import Budget
+from xhs_utils.async_http_util import AsyncHttpTransport
+from xhs_utils.cache_util import ResponseCache
+from xhs_utils.cookie_pool import CookiePool
+from xhs_utils.proxy_pool import ProxyPool
+from xhs_utils.rate_limit_util import RateLimiter
+from xhs_utils.request_util import RetryPolicy, XhsRiskError, async_execute
+from xhs_utils.singleflight_util import AsyncSingleFlight, make_key
+from xhs_utils.xhs_util import splice_str, get_session, get_common_headers
+from loguru import logger
+
+"""
+    获小红书的api, 异步版本
+    方法名, 参数和 (success, msg, data) 返回值与 XHS_Apis 一致, 调用时需要 await
+    :param cookies_str: 你的cookies, 也可以传入 xhs_utils.xhs_util.XhsSession 或 xhs_utils.cookie_pool.CookiePool
+    :param proxies: 各方法的代理, requests 格式的字典, 或者 xhs_utils.proxy_pool.ProxyPool
+    :param max_connections: 每组代理的最大连接数, 也就是同时在途的最大请求数
+    :param max_keepalive_connections: 保持的空闲 keep-alive 连接数
+    :param transport: 自定义的 AsyncHttpTransport, 多个实例可以共用一个连接池
+    :param http2: 使用 HTTP/2 多路复用连接, 默认读取环境变量 XHS_HTTP2, 协商结果见 self.transport.stats()
+    :param retry_policy: 超时和重试策略 RetryPolicy, 默认连接超时5秒, 读取超时15秒, 网络错误和5xx最多重试3次
+    :param rate_limiter: 按账号/接口族限速的 RateLimiter, 默认读取环境变量 XHS_RATE_LIMIT, 可以和同步的 XHS_Apis 共用
+    :param cache: 笔记详情/用户信息/频道/搜索联想的响应缓存 ResponseCache, 默认读取环境变量 XHS_CACHE / XHS_CACHE_PATH, 传 False 不缓存
+"""
+class AsyncXHS_Apis():
+    def __init__(self, max_connections=100, max_keepalive_connections=20, transport: AsyncHttpTransport = None, http2: bool = None, retry_policy: RetryPolicy = None, rate_limiter: RateLimiter = None, cache: ResponseCache = None):
+        self.base_url = "https://edith.xiaohongshu.com"
+        if http2 is None:
+            http2 = bool(os.getenv('XHS_HTTP2'))
+        self.transport = transport or AsyncHttpTransport(max_connections, max_keepalive_connections, http2=http2)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.rate_limiter = rate_limiter or RateLimiter.from_env()
+        if cache is None:
+            cache = ResponseCache.from_env()
+        self.cache = cache or None
+        self.singleflight = AsyncSingleFlight()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.aclose()
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+    async def _request(self, method: str, api: str, cookies_str: str, data='', proxies: dict = None):
+        """
+            签名并发送请求, 返回解析后的json
+            同一账号同时发出的相同请求只发一次, 共用结果, 见 _send_request
+        """
+        account = id(cookies_str) if isinstance(cookies_str, CookiePool) else get_session(cookies_str).a1
+        return await self.singleflight.do(make_key(method, api, account, data), self._send_request, method, api, cookies_str, data, proxies)
+
+    async def _send_request(self, method: str, api: str, cookies_str: str, data='', proxies: dict = None):
+        """
+            实际签名并发送请求, 返回解析后的json
+            签名可能要和node进程通信, 放到线程池里执行, 不阻塞事件循环
+            每次发送前先从 rate_limiter 拿到该账号和接口族的令牌
+            网络错误和 5xx 按 retry_policy 退避重试, 每次重试重新签名; 命中风控状态码抛 XhsRiskError
+            cookies_str 为 CookiePool 时从池里挑一个账号, 命中风控或登录失效时隔离该账号
+            proxies 为 ProxyPool 时每次发送都从池里挑一个代理, 并记录这个代理的结果和延迟
+        """
+        cookie_pool = cookies_str if isinstance(cookies_str, CookiePool) else None
+        if cookie_pool is not None:
+            cookies_str = cookie_pool.acquire()
+        session = get_session(cookies_str)
+        loop = asyncio.get_running_loop()
+
+        async def send(attempt, timeout):
+            headers, cookies, trans_data = await loop.run_in_executor(None, session.generate_request_params, api, data, method)
+            headers['cookie'] = session.cookie_header
+            if method == 'GET':
+                return await self._transport_request('GET', self.base_url + api, proxies, session.a1, headers=headers, timeout=timeout)
+            return await self._transport_request('POST', self.base_url + api, proxies, session.a1, headers=headers, content=trans_data.encode('utf-8'), timeout=timeout)
+        try:
+            response = await async_execute(send, self.retry_policy, lambda: self.rate_limiter.async_acquire(session.a1, api))
+        except XhsRiskError as e:
+            if cookie_pool is not None:
+                cookie_pool.quarantine(cookies_str, str(e))
+            raise
+        res_json = json_util.loads(response.content)
+        if cookie_pool is not None:
+            cookie_pool.check_response(cookies_str, res_json)
+        return res_json
+
+    async def _transport_request(self, method: str, url: str, proxies, account: str = None, **kwargs):
+        """
+            通过 self.transport 发出一次请求
+            proxies 为 ProxyPool 时从池里挑一个代理, 并记录这个代理的结果和延迟
+        """
+        proxy_pool = proxies if isinstance(proxies, ProxyPool) else None
+        proxy = proxy_pool.acquire(account) if proxy_pool is not None else None
+        start = time.monotonic()
+        try:
+            response = await self.transport.request(method, url, proxy.proxies if proxy is not None else proxies, **kwargs)
+        except Exception:
+            if proxy is not None:
+                proxy_pool.report(proxy)
+            raise
+        if proxy is not None:
+            proxy_pool.report(proxy, response.status_code, time.monotonic() - start)
+        return response
+
+    async def _cached_request(self, endpoint: str, key: str, use_cache: bool, method: str, api: str, cookies_str: str, data='', proxies: dict = None):
+        """
+            带缓存的 _request, 命中缓存时不发请求, 成功的响应按 self.cache 中该接口的缓存时间写入缓存
+        """
+        if use_cache and self.cache is not None:
+            res_json = self.cache.get(endpoint, key)
+            if res_json is not None:
+                return res_json
+        res_json = await self._request(method, api, cookies_str, data, proxies)
+        if self.cache is not None:
+            self.cache.set(endpoint, key, res_json)
+        return res_json
+
+    async def get_homefeed_all_channel(self, cookies_str: str, proxies: dict = None, use_cache=True):
+        """
+            获取主页的所有频道
+            返回主页的所有频道
+            :param use_cache: 为 False 时跳过缓存直接请求, 结果仍然写入缓存
+        """
+        res_json = None
+        try:
+            api = "/api/sns/web/v1/homefeed/category"
+            res_json = await self._cached_request('get_homefeed_all_channel', '', use_cache, 'GET', api, cookies_str, '', proxies)
+            success, msg = res_json["success"], res_json["msg"]
+        except Exception as e:
+            success = False
+            msg = str(e)
+        return success, msg, res_json
+
+    async def get_homefeed_recommend(self, category, cursor_score, refresh_type, note_index, cookies_str: str, proxies: dict = None):
+        """
+            获取主页推荐的笔记
+            :param category: 你想要获取的频道
+            :param cursor_score: 你想要获取的笔记的cursor
+            :param refresh_type: 你想要获取的笔记的刷新类型
+            :param note_index: 你想要获取的笔记的index
+            :param cookies_str: 你的cookies
+            返回主页推荐的笔记
+        """
+        res_json = None
+        try:
+            api = "/api/sns/web/v1/homefeed"
+            data = {
+                "cursor_score": cursor_score,
+                "num": 20,
+                "refresh_type": refresh_type,
+                "note_index": note_index,
+                "unread_begin_note_id": "",
+                "unread_end_note_id": "",
+                "unread_note_count": 0,
+                "category": category,
+                "search_key": "",
+                "need_num": 10,
+                "image_formats": [
+                    "jpg",
+                    "webp",
+                    "avif"
+                ],
+                "need_filter_image": False
+            }
+            res_json = await self._request('POST', api, cookies_str, data, proxies)
+            success, msg = res_json["success"], res_json["msg"]
+        except Exception as e:
+            success = False
+            msg = str(e)
+        return success, msg, res_json
+
+    async def iter_homefeed_recommend(self, category, cookies_str: str, proxies: dict = None, cursor: tuple = None):
+        """
+            逐页获取主页推荐的笔记, 每拿到一页 yield 一次 (notes, cursor, has_more), 不在内存里攒全部结果
+            :param category: 你想要获取的频道
+            :param cookies_str: 你的cookies
+            :param cursor: (cursor_score, note_index), 传入上次 yield 的 cursor 可以接着翻
+            请求失败时抛出异常
+        """
+        cursor_score, note_index = cursor or ("", 0)
+        refresh_type = 3 if cursor_score else 1
+        while True:
+            success, msg, res_json = await self.get_homefeed_recommend(category, cursor_score, refresh_type, note_index, cookies_str, proxies)
+            if not success:
+                raise Exception(msg)
+            if "items" not in res_json["data"]:
+                return
+            notes = res_json["data"]["items"]
+            cursor_score = res_json["data"]["cursor_score"]
+            refresh_type = 3
+            note_index += 20
+            yield notes, (cursor_score, note_index), True
+
+    async def get_homefeed_recommend_by_num(self, category, require_num, cookies_str: str, proxies: dict = None, deadline: float = None, max_pages: int = None):
+        """
+            根据数量获取主页推荐的笔记
+            :param category: 你想要获取的频道
+            :param require_num: 你想要获取的笔记的数量
+            :param cookies_str: 你的cookies
+            :param deadline: 时间预算(秒), 用完后返回已经拿到的部分结果
+            :param max_pages: 最多请求的页数
+            根据数量返回主页推荐的笔记
+        """
+        return await Budget(deadline, max_pages).async_collect(self.iter_homefeed_recommend(category, cookies_str, proxies), require_num)
+
+    async def get_user_info(self, user_id: str, cookies_str: str, proxies: dict = None, use_cache=True):
+        """
+            获取用户的信息
+            :param user_id: 你想要获取的用户的id
+            :param cookies_str: 你的cookies
+            返回用户的信息
+            :param use_cache: 为 False 时跳过缓存直接请求, 结果仍然写入缓存
+        """
+        res_json = None
+        try:
+            api = "/api/sns/web/v1/user/otherinfo"
+            params = {
+                "target_user_id": user_id
+            }
+            splice_api = splice_str(api, params)
+            res_json = await self._cached_request('get_user_info', user_id, use_cache, 'GET', splice_api, cookies_str, '', proxies)
+            success, msg = res_json["success"], res_json["msg"]
+        except Exception as e:
+            success = False
+            msg = str(e)
+        return success, msg, res_json
+
+    async def get_user_self_info(self, cookies_str: str, proxies: dict = None):
+        """
+            获取用户自己的信息1
+            :param cookies_str: 你的cookies
+            返回用户自己的信息1
+        """
+        res_json = None
+        try:
+            api = "/api/sns/web/v1/user/selfinfo"
+            res_json = await self._request('GET', api, cookies_str, '', proxies)
+            success, msg = res_json["success"], res_json["msg"]
+        except Exception as e:
+            success = False
+            msg = str(e)
+        return success, msg, res_json
+
+    async def get_user_self_info2(self, cookies_str: str, proxies: dict = None):
+        """
+            获取用户自己的信息2
+            :param cookies_str: 你的cookies
+            返回用户自己的信息2
+        """
+        res_json = None
+        try:
+            api = "/api/sns/web/v2/user/me"
+            res_json = await self._request('GET', api, cookies_str, '', proxies)
+            success, msg = res_json["success"], res_json["msg"]
+        except Exception as e:
+            success = False
+            msg = str(e)
+        return success, msg, res_json
+
+    async def get_user_note_info(self, user_id: str, cursor: str, cookies_str: str, xsec_token='', xsec_source='', proxies: dict = None):
+        """
+            获取用户指定位置的笔记
+            :param user_id: 你想要获取的用户的id
+            :param cursor: 你想要获取的笔记的cursor
+            :param cookies_str: 你的cookies
+            返回用户指定位置的笔记
+        """
+        res_json = None
+        try:
+            api = "/api/sns/web/v1/user_posted"
+            params = {
+                "num": "30",
+                "cursor": cursor,
+                "user_id": user_id,
+                "image_formats": "jpg,webp,avif",
+                "xsec_token": xsec_token,
+                "xsec_source": xsec_source,
+            }
+            splice_api = splice_str(api, params)
+            res_json = await self._request('GET', splice_api, cookies_str, '', proxies)
+            success, msg = res_json["success"], res_json["msg"]
+        except Exception as e:
+            success = False
+            msg = str(e)
+        return success, msg, res_json
+
+    async def iter_user_all_notes(self, user_url: str, cookies_str: str, proxies: dict = None, cursor: str = ''):
+        """
+            逐页获取用户的笔记, 每拿到一页 yield 一次 (notes, cursor, has_more), 不在内存里攒全部结果
+            :param user_url: 用户主页的url
+            :param cookies_str: 你的cookies
+            :param cursor: 开始翻页的位置, 传入上次 yield 的 cursor 可以接着翻
+            请求失败时抛出异常
+        """
+        urlParse = urllib.parse.urlparse(user_url)
+        user_id = urlParse.path.split("/")[-1]
+        kvs = urlParse.query.split('&')
+        kvDist = {kv.split('=')[0]: kv.split('=')[1] for kv in kvs}
+        xsec_token = kvDist['xsec_token'] if 'xsec_token' in kvDist else ""
+        xsec_source = kvDist['xsec_source'] if 'xsec_source' in kvDist else "pc_search"
+        while True:
+            success, msg, res_json = await self.get_user_note_info(user_id, cursor, cookies_str, xsec_token, xsec_source, proxies)
+            if not success:
+                raise Exception(msg)
+            if 'cursor' not in res_json["data"]:
+                return
+            notes = res_json["data"]["notes"]
+            cursor = str(res_json["data"]["cursor"])
+            has_more = len(notes) > 0 and res_json["data"]["has_more"]
+            yield notes, cursor, has_more
+            if not has_more:
+                return
+
+    async def get_user_all_notes(self, user_url: str, cookies_str: str, proxies: dict = None, deadline: float = None, max_pages: int = None, max_items: int = None):
+        """
+           获取用户所有笔记
+           :param user_id: 你想要获取的用户的id
+           :param cookies_str: 你的cookies
+           :param deadline: 时间预算(秒), 用完后返回已经拿到的部分结果
+           :param max_pages: 最多请求的页数
+           :param max_items: 最多返回的条数
+           返回用户的所有笔记
+        """
+        return await Budget(deadline, max_pages, max_items).async_collect(self.iter_user_all_notes(user_url, cookies_str, proxies))
+
+    async def get_user_like_note_info(self, user_id: str, cursor: str, cookies_str: str, xsec_token='', xsec_source='', proxies: dict = None):
+        """
+            获取用户指定位置喜欢的笔记
+            :param user_id: 你想要获取的用户的id
+            :param cursor: 你想要获取的笔记的cursor
+            :param cookies_str: 你的cookies
+            返回用户指定位置喜欢的笔记
+        """
+        res_json = None
+        try:
+            api = "/api/sns/web/v1/note/like/page"
+            params = {
+                "num": "30",
+                "cursor": cursor,
+                "user_id": user_id,
+                "image_formats": "jpg,webp,avif",
+                "xsec_token": xsec_token,
+                "xsec_source": xsec_source,
+            }
+            splice_api = splice_str(api, params)
+            res_json = await self._request('GET', splice_api, cookies_str, '', proxies)
+            success, msg = res_json["success"], res_json["msg"]
+        except Exception as e:
+            success = False
+            msg = str(e)
+        return success, msg, res_json
+
+    async def iter_user_all_like_note_info(self, user_url: str, cookies_str: str, proxies: dict = None, cursor: str = ''):
+        """
+            逐页获取用户喜欢的笔记, 每拿到一页 yield 一次 (notes, cursor, has_more), 不在内存里攒全部结果
+            :param user_url: 用户主页的url
+            :param cookies_str: 你的cookies
+            :param cursor: 开始翻页的位置, 传入上次 yield 的 cursor 可以接着翻
+            请求失败时抛出异常
+        """
+        urlParse = urllib.parse.urlparse(user_url)
+        user_id = urlParse.path.split("/")[-1]
+        kvs = urlParse.query.split('&')
+        kvDist = {kv.split('=')[0]: kv.split('=')[1] for kv in kvs}
+        xsec_token = kvDist['xsec_token'] if 'xsec_token' in kvDist else ""
+        xsec_source = kvDist['xsec_source'] if 'xsec_source' in kvDist else "pc_user"
+        while True:
+            success, msg, res_json = await self.get_user_like_note_info(user_id, cursor, cookies_str, xsec_token, xsec_source, proxies)
+            if not success:
+                raise Exception(msg)
+            if 'cursor' not in res_json["data"]:
+                return
+            notes = res_json["data"]["notes"]
+            cursor = str(res_json["data"]["cursor"])
+            has_more = len(notes) > 0 and res_json["data"]["has_more"]
+            yield notes, cursor, has_more
+            if not has_more:
+                return
+
+    async def get_user_all_like_note_info(self, user_url: str, cookies_str: str, proxies: dict = None, deadline: float = None, max_pages: int = None, max_items: int = None):
+        """
+            获取用户所有喜欢笔记
+            :param user_id: 你想要获取的用户的id
+            :param cookies_str: 你的cookies
+            :param deadline: 时间预算(秒), 用完后返回已经拿到的部分结果
+            :param max_pages: 最多请求的页数
+            :param max_items: 最多返回的条数
+            返回用户的所有喜欢笔记
+        """
+        return await Budget(deadline, max_pages, max_items).async_collect(self.iter_user_all_like_note_info(user_url, cookies_str, proxies))
+
+    async def get_user_collect_note_info(self, user_id: str, cursor: str, cookies_str: str, xsec_token='', xsec_source='', proxies: dict = None):
+        """
+            获取用户指定位置收藏的笔记
+            :param user_id: 你想要获取的用户的id
+            :param cursor: 你想要获取的笔记的cursor
+            :param cookies_str: 你的cookies
+            返回用户指定位置收藏的笔记
+        """
+        res_json = None
+        try:
+            api = "/api/sns/web/v2/note/collect/page"
+            params = {
+                "num": "30",
+                "cursor": cursor,
+                "user_id": user_id,
+                "image_formats": "jpg,webp,avif",
+                "xsec_token": xsec_token,
+                "xsec_source": xsec_source,
+            }
+            splice_api = splice_str(api, params)
+            res_json = await self._request('GET', splice_api, cookies_str, '', proxies)
+            success, msg = res_json["success"], res_json["msg"]
+        except Exception as e:
+            success = False
+            msg = str(e)
+        return success, msg, res_json
+
+    async def iter_user_all_collect_note_info(self, user_url: str, cookies_str: str, proxies: dict = None, cursor: str = ''):
+        """
+            逐页获取用户收藏的笔记, 每拿到一页 yield 一次 (notes, cursor, has_more), 不在内存里攒全部结果
+            :param user_url: 用户主页的url
+            :param cookies_str: 你的cookies
+            :param cursor: 开始翻页的位置, 传入上次 yield 的 cursor 可以接着翻
+            请求失败时抛出异常
+        """
+        urlParse = urllib.parse.urlparse(user_url)
+        user_id = urlParse.path.split("/")[-1]
+        kvs = urlParse.query.split('&')
+        kvDist = {kv.split('=')[0]: kv.split('=')[1] for kv in kvs}
+        xsec_token = kvDist['xsec_token'] if 'xsec_token' in kvDist else ""
+        xsec_source = kvDist['xsec_source'] if 'xsec_source' in kvDist else "pc_search"
+        while True:
+            success, msg, res_json = await self.get_user_collect_note_info(user_id, cursor, cookies_str, xsec_token, xsec_source, proxies)
+            if not success:
+                raise Exception(msg)
+            if 'cursor' not in res_json["data"]:
+                return
+            notes = res_json["data"]["notes"]
+            cursor = str(res_json["data"]["cursor"])
+            has_more = len(notes) > 0 and res_json["data"]["has_more"]
+            yield notes, cursor, has_more
+            if not has_more:
+                return
+
+    async def get_user_all_collect_note_info(self, user_url: str, cookies_str: str, proxies: dict = None, deadline: float = None, max_pages: int = None, max_items: int = None):
+        """
+            获取用户所有收藏笔记
+            :param user_id: 你想要获取的用户的id
+            :param cookies_str: 你的cookies
+            :param deadline: 时间预算(秒), 用完后返回已经拿到的部分结果
+            :param max_pages: 最多请求的页数
+            :param max_items: 最多返回的条数
+            返回用户的所有收藏笔记
+        """
+        return await Budget(deadline, max_pages, max_items).async_collect(self.iter_user_all_collect_note_info(user_url, cookies_str, proxies))
+
+    async def get_note_info(self, url: str, cookies_str: str, proxies: dict = None, use_cache=True):
+        """
+            获取笔记的详细
+            :param url: 你想要获取的笔记的url
+            :param cookies_str: 你的cookies
+            :param xsec_source: 你的xsec_source 默认为pc_search pc_user pc_feed
+            返回笔记的详细
+            :param use_cache: 为 False 时跳过缓存直接请求, 结果仍然写入缓存
+        """
+        res_json = None
+        try:
+            urlParse = urllib.parse.urlparse(url)
+            note_id = urlParse.path.split("/")[-1]
+            kvs = urlParse.query.split('&')
+            kvDist = {kv.split('=')[0]: kv.split('=')[1] for kv in kvs}
+            api = "/api/sns/web/v1/feed"
+            data = {
+                "source_note_id": note_id,
+                "image_formats": [
+                    "jpg",
+                    "webp",
+                    "avif"
+                ],
+                "extra": {
+                    "need_body_topic": "1"
+                },
+                "xsec_source": kvDist['xsec_source'] if 'xsec_source' in kvDist else "pc_search",
+                "xsec_token": kvDist['xsec_token']
+            }
+            res_json = await self._cached_request('get_note_info', note_id, use_cache, 'POST', api, cookies_str, data, proxies)
+            success, msg = res_json["success"], res_json["msg"]
+        except Exception as e:
+            success = False
+            msg = str(e)
+        return success, msg, res_json
+
+    async def get_search_keyword(self, word: str, cookies_str: str, proxies: dict = None, use_cache=True):
+        """
+            获取搜索关键词
+            :param word: 你的关键词
+            :param cookies_str: 你的cookies
+            返回搜索关键词
+            :param use_cache: 为 False 时跳过缓存直接请求, 结果仍然写入缓存
+        """
+        res_json = None
+        try:
+            api = "/api/sns/web/v1/search/recommend"
+            params = {
+                "keyword": urllib.parse.quote(word)
+            }
+            splice_api = splice_str(api, params)
+            res_json = await self._cached_request('get_search_keyword', word, use_cache, 'GET', splice_api, cookies_str, '', proxies)
+            success, msg = res_json["success"], res_json["msg"]
+        except Exception as e:
+            success = False
+            msg = str(e)
+        return success, msg, res_json
+
+    get_search_note_data = staticmethod(XHS_Apis.get_search_note_data)
+
+    async def search_note(self, query: str, cookies_str: str, page=1, sort_type_choice=0, note_type=0, note_time=0, note_range=0, pos_distance=0, geo="", proxies: dict = None):
+        """
+            获取搜索笔记的结果
+            :param query 搜索的关键词
+            :param cookies_str 你的cookies
+            :param page 搜索的页数
+            :param sort_type_choice 排序方式 0 综合排序, 1 最新, 2 最多点赞, 3 最多评论, 4 最多收藏
+            :param note_type 笔记类型 0 不限, 1 视频笔记, 2 普通笔记
+            :param note_time 笔记时间 0 不限, 1 一天内, 2 一周内天, 3 半年内
+            :param note_range 笔记范围 0 不限, 1 已看过, 2 未看过, 3 已关注
+            :param pos_distance 位置距离 0 不限, 1 同城, 2 附近 指定这个必须要指定 geo
+            返回搜索的结果
+        """
+        res_json = None
+        try:
+            api = "/api/sns/web/v1/search/notes"
+            data = self.get_search_note_data(query, page, sort_type_choice, note_type, note_time, note_range, pos_distance, geo)
+            res_json = await self._request('POST', api, cookies_str, data, proxies)
+            success, msg = res_json["success"], res_json["msg"]
+        except Exception as e:
+            success = False
+            msg = str(e)
+        return success, msg, res_json
+
+    async def iter_search_note(self, query: str, cookies_str: str, sort_type_choice=0, note_type=0, note_time=0, note_range=0, pos_distance=0, geo="", proxies: dict = None, page=1):
+        """
+            逐页搜索笔记, 每拿到一页 yield 一次 (notes, cursor, has_more), cursor 是下一页的页码
+            参数同 search_some_note, page 为开始的页码, 传入上次 yield 的 cursor 可以接着翻
+            请求失败时抛出异常
+        """
+        while True:
+            success, msg, res_json = await self.search_note(query, cookies_str, page, sort_type_choice, note_type, note_time, note_range, pos_distance, geo, proxies)
+            if not success:
+                raise Exception(msg)
+            if "items" not in res_json["data"]:
+                return
+            page += 1
+            yield res_json["data"]["items"], page, res_json["data"]["has_more"]
+            if not res_json["data"]["has_more"]:
+                return
+
+    async def search_some_note(self, query: str, require_num: int, cookies_str: str, sort_type_choice=0, note_type=0, note_time=0, note_range=0, pos_distance=0, geo="", proxies: dict = None, deadline: float = None, max_pages: int = None):
+        """
+            指定数量搜索笔记，设置排序方式和笔记类型和笔记数量
+            :param query 搜索的关键词
+            :param require_num 搜索的数量
+            :param cookies_str 你的cookies
+            :param sort_type_choice 排序方式 0 综合排序, 1 最新, 2 最多点赞, 3 最多评论, 4 最多收藏
+            :param note_type 笔记类型 0 不限, 1 视频笔记, 2 普通笔记
+            :param note_time 笔记时间 0 不限, 1 一天内, 2 一周内天, 3 半年内
+            :param note_range 笔记范围 0 不限, 1 已看过, 2 未看过, 3 已关注
+            :param pos_distance 位置距离 0 不限, 1 同城, 2 附近 指定这个必须要指定 geo
+            :param geo: 定位信息 经纬度
+            :param deadline: 时间预算(秒), 用完后返回已经拿到的部分结果
+            :param max_pages: 最多请求的页数
+            返回搜索的结果
+        """
+        pages = self.iter_search_note(query, cookies_str, sort_type_choice, note_type, note_time, note_range, pos_distance, geo, proxies)
+        return await Budget(deadline, max_pages).async_collect(pages, require_num)
+
+    async def search_user(self, query: str, cookies_str: str, page=1, proxies: dict = None):
+        """
+            获取搜索用户的结果
+            :param query 搜索的关键词
+            :param cookies_str 你的cookies
+            :param page 搜索的页数
+            返回搜索的结果
+        """
+        res_json = None
+        try:
+            api = "/api/sns/web/v1/search/usersearch"
+            data = {
+                "search_user_request": {
+                    "keyword": query,
+                    "search_id": "2dn9they1jbjxwawlo4xd",
+                    "page": page,
+                    "page_size": 15,
+                    "biz_type": "web_search_user",
+                    "request_id": "22471139-1723999898524"
+                }
+            }
+            res_json = await self._request('POST', api, cookies_str, data, proxies)
+            success, msg = res_json["success"], res_json["msg"]
+        except Exception as e:
+            success = False
+            msg = str(e)
+        return success, msg, res_json
+
+    async def iter_search_user(self, query: str, cookies_str: str, proxies: dict = None, page=1):
+        """
+            逐页搜索用户, 每拿到一页 yield 一次 (users, cursor, has_more), cursor 是下一页的页码
+            :param query 搜索的关键词
+            :param cookies_str 你的cookies
+            :param page 开始的页码, 传入上次 yield 的 cursor 可以接着翻
+            请求失败时抛出异常
+        """
+        while True:
+            success, msg, res_json = await self.search_user(query, cookies_str, page, proxies)
+            if not success:
+                raise Exception(msg)
+            if "users" not in res_json["data"]:
+                return
+            page += 1
+            yield res_json["data"]["users"], page, res_json["data"]["has_more"]
+            if not res_json["data"]["has_more"]:
+                return
+
+    async def search_some_user(self, query: str, require_num: int, cookies_str: str, proxies: dict = None, deadline: float = None, max_pages: int = None):
+        """
+            指定数量搜索用户
+            :param query 搜索的关键词
+            :param require_num 搜索的数量
+            :param cookies_str 你的cookies
+            :param deadline: 时间预算(秒), 用完后返回已经拿到的部分结果
+            :param max_pages: 最多请求的页数
+            返回搜索的结果
+        """
+        return await Budget(deadline, max_pages).async_collect(self.iter_search_user(query, cookies_str, proxies), require_num)
+
+    async def get_note_out_comment(self, note_id: str, cursor: str, xsec_token: str, cookies_str: str, proxies: dict = None):
+        """
+            获取指定位置的笔记一级评论
+            :param note_id 笔记的id
+            :param cursor 指定位置的评论的cursor
+            :param cookies_str 你的cookies
+            返回指定位置的笔记一级评论
+        """
+        res_json = None
+        try:
+            api = "/api/sns/web/v2/comment/page"
+            params = {
+                "note_id": note_id,
+                "cursor": cursor,
+                "top_comment_id": "",
+                "image_formats": "jpg,webp,avif",
+                "xsec_token": xsec_token
+            }
+            splice_api = splice_str(api, params)
+            res_json = await self._request('GET', splice_api, cookies_str, '', proxies)
+            success, msg = res_json["success"], res_json["msg"]
+        except Exception as e:
+            success = False
+            msg = str(e)
+        return success, msg, res_json
+
+    async def iter_note_all_out_comment(self, note_id: str, xsec_token: str, cookies_str: str, proxies: dict = None, cursor: str = ''):
+        """
+            逐页获取笔记的一级评论, 每拿到一页 yield 一次 (comments, cursor, has_more), 不在内存里攒全部结果
+            :param note_id 笔记的id
+            :param cookies_str 你的cookies
+            :param cursor 开始翻页的位置, 传入上次 yield 的 cursor 可以接着翻
+            请求失败时抛出异常
+        """
+        count = 0
+        while True:
+            success, msg, res_json = await self.get_note_out_comment(note_id, cursor, xsec_token, cookies_str, proxies)
+            if not success:
+                raise Exception(msg)
+            if 'cursor' not in res_json["data"]:
+                return
+            comments = res_json["data"]["comments"]
+            cursor = str(res_json["data"]["cursor"])
+            count += len(comments)
+            has_more = count > 0 and res_json["data"]["has_more"]
+            yield comments, cursor, has_more
+            if not has_more:
+                return
+
+    async def get_note_all_out_comment(self, note_id: str, xsec_token: str, cookies_str: str, proxies: dict = None, deadline: float = None, max_pages: int = None, max_items: int = None):
+        """
+            获取笔记的全部一级评论
+            :param note_id 笔记的id
+            :param cookies_str 你的cookies
+            :param deadline: 时间预算(秒), 用完后返回已经拿到的部分结果
+            :param max_pages: 最多请求的页数
+            :param max_items: 最多返回的条数
+            返回笔记的全部一级评论
+        """
+        return await Budget(deadline, max_pages, max_items).async_collect(self.iter_note_all_out_comment(note_id, xsec_token, cookies_str, proxies))
+
+    async def get_note_inner_comment(self, comment: dict, cursor: str, xsec_token: str, cookies_str: str, proxies: dict = None):
+        """
+            获取指定位置的笔记二级评论
+            :param comment 笔记的一级评论
+            :param cursor 指定位置的评论的cursor
+            :param cookies_str 你的cookies
+            返回指定位置的笔记二级评论
+        """
+        res_json = None
+        try:
+            api = "/api/sns/web/v2/comment/sub/page"
+            params = {
+                "note_id": comment['note_id'],
+                "root_comment_id": comment['id'],
+                "num": "10",
+                "cursor": cursor,
+                "image_formats": "jpg,webp,avif",
+                "top_comment_id": '',
+                "xsec_token": xsec_token
+            }
+            splice_api = splice_str(api, params)
+            res_json = await self._request('GET', splice_api, cookies_str, '', proxies)
+            success, msg = res_json["success"], res_json["msg"]
+        except Exception as e:
+            success = False
+            msg = str(e)
+        return success, msg, res_json
+
+    async def iter_note_all_inner_comment(self, comment: dict, xsec_token: str, cookies_str: str, proxies: dict = None, cursor: str = None):
+        """
+            逐页获取一级评论下的二级评论, 每拿到一页 yield 一次 (comments, cursor, has_more), 不会修改 comment
+            :param comment 笔记的一级评论
+            :param cookies_str 你的cookies
+            :param cursor 开始翻页的位置, 默认从 comment['sub_comment_cursor'] 开始
+            请求失败时抛出异常
+        """
+        if cursor is None:
+            if not comment['sub_comment_has_more']:
+                return
+            cursor = comment['sub_comment_cursor']
+        while True:
+            success, msg, res_json = await self.get_note_inner_comment(comment, cursor, xsec_token, cookies_str, proxies)
+            if not success:
+                raise Exception(msg)
+            if 'cursor' not in res_json["data"]:
+                return
+            cursor = str(res_json["data"]["cursor"])
+            yield res_json["data"]["comments"], cursor, res_json["data"]["has_more"]
+            if not res_json["data"]["has_more"]:
+                return
+
+    async def get_note_all_inner_comment(self, comment: dict, xsec_token: str, cookies_str: str, proxies: dict = None, deadline: float = None, max_pages: int = None):
+        """
+            获取笔记的全部二级评论
+            :param comment 笔记的一级评论
+            :param cookies_str 你的cookies
+            :param deadline: 时间预算(秒), 用完后返回已经拿到的部分结果
+            :param max_pages: 最多请求的页数
+            返回笔记的全部二级评论
+        """
+        if not comment['sub_comment_has_more']:
+            return True, 'success', comment
+        success, msg, inner_comment_list = await Budget(deadline, max_pages).async_collect(self.iter_note_all_inner_comment(comment, xsec_token, cookies_str, proxies))
+        comment['sub_comments'].extend(inner_comment_list)
+        # 没翻完时记下断点, 之后可以从 sub_comment_cursor 接着翻
+        if inner_comment_list.cursor is not None:
+            comment['sub_comment_cursor'] = inner_comment_list.cursor
+        comment['sub_comment_has_more'] = inner_comment_list.truncated or not success
+        return success, msg, comment
+
+    async def get_note_all_comment(self, url: str, cookies_str: str, proxies: dict = None, deadline: float = None, max_pages: int = None, max_items: int = None, workers: int = 5):
+        """
+            获取一篇文章的所有评论
+            一级评论每到一页就开始并发展开这一页的二级评论, 返回的顺序和一级评论的顺序一致
+            :param note_id: 你想要获取的笔记的id
+            :param cookies_str: 你的cookies
+            :param deadline: 时间预算(秒), 一级评论和二级评论共用, 用完后返回已经拿到的部分结果, 没翻完的二级评论 sub_comment_has_more 为 True
+            :param max_pages: 一级评论最多请求的页数
+            :param max_items: 最多返回的一级评论条数
+            :param workers: 同时展开二级评论的一级评论数, 请求仍然受账号限速约束
+            返回一篇文章的所有评论
+        """
+        out_comment_list = []
+        budget = Budget(deadline)
+        semaphore = asyncio.Semaphore(workers)
+        tasks = []
+        try:
+            urlParse = urllib.parse.urlparse(url)
+            note_id = urlParse.path.split("/")[-1]
+            kvs = urlParse.query.split('&')
+            kvDist = {kv.split('=')[0]: kv.split('=')[1] for kv in kvs}
+            xsec_token = kvDist['xsec_token']
+
+            async def expand(comment):
+                async with semaphore:
+                    # 拿到并发名额时才计算剩余时间, 排队等待的时间也算在预算里
+                    return await self.get_note_all_inner_comment(comment, xsec_token, cookies_str, proxies, budget.remaining())
+
+            async def submit(pages):
+                count = 0
+                async for comments, cursor, has_more in pages:
+                    for comment in comments:
+                        count += 1
+                        if comment['sub_comment_has_more'] and (max_items is None or count <= max_items):
+                            tasks.append(asyncio.ensure_future(expand(comment)))
+                    yield comments, cursor, has_more
+
+            pages = submit(self.iter_note_all_out_comment(note_id, xsec_token, cookies_str, proxies))
+            success, msg, out_comment_list = await Budget(deadline, max_pages, max_items).async_collect(pages)
+            if not success:
+                raise Exception(msg)
+            budget.truncated = out_comment_list.truncated
+            for task in tasks:
+                inner_success, inner_msg, comment = await task
+                if not inner_success:
+                    raise Exception(inner_msg)
+                if comment['sub_comment_has_more']:
+                    budget.truncated = True
+        except Exception as e:
+            success = False
+            msg = str(e)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return success, msg, budget.result(out_comment_list, getattr(out_comment_list, 'cursor', None))
+
+    async def get_unread_message(self, cookies_str: str, proxies: dict = None):
+        """
+            获取未读消息
+            :param cookies_str: 你的cookies
+            返回未读消息
+        """
+        res_json = None
+        try:
+            api = "/api/sns/web/unread_count"
+            res_json = await self._request('GET', api, cookies_str, '', proxies)
+            success, msg = res_json["success"], res_json["msg"]
+        except Exception as e:
+            success = False
+            msg = str(e)
+        return success, msg, res_json
+
+    async def get_metions(self, cursor: str, cookies_str: str, proxies: dict = None):
+        """
+            获取评论和@提醒
+            :param cursor: 你想要获取的评论和@提醒的cursor
+            :param cookies_str: 你的cookies
+            返回评论和@提醒
+        """
+        res_json = None
+        try:
+            api = "/api/sns/web/v1/you/mentions"
+            params = {
+                "num": "20",
+                "cursor": cursor
+            }
+            splice_api = splice_str(api, params)
+            res_json = await self._request('GET', splice_api, cookies_str, '', proxies)
+            success, msg = res_json["success"], res_json["msg"]
+        except Exception as e:
+            success = False
+            msg = str(e)
+        return success, msg, res_json
+
+    async def iter_all_metions(self, cookies_str: str, proxies: dict = None, cursor: str = ''):
+        """
+            逐页获取评论和@提醒, 每拿到一页 yield 一次 (messages, cursor, has_more), 不在内存里攒全部结果
+            :param cookies_str: 你的cookies
+            :param cursor: 开始翻页的位置, 传入上次 yield 的 cursor 可以接着翻
+            请求失败时抛出异常
+        """
+        while True:
+            success, msg, res_json = await self.get_metions(cursor, cookies_str, proxies)
+            if not success:
+                raise Exception(msg)
+            if 'cursor' not in res_json["data"]:
+                return
+            cursor = str(res_json["data"]["cursor"])
+            yield res_json["data"]["message_list"], cursor, res_json["data"]["has_more"]
+            if not res_json["data"]["has_more"]:
+                return
+
+    async def get_all_metions(self, cookies_str: str, proxies: dict = None, deadline: float = None, max_pages: int = None, max_items: int = None):
+        """
+            获取全部的评论和@提醒
+            :param cookies_str: 你的cookies
+            :param deadline: 时间预算(秒), 用完后返回已经拿到的部分结果
+            :param max_pages: 最多请求的页数
+            :param max_items: 最多返回的条数
+            返回全部的评论和@提醒
+        """
+        return await Budget(deadline, max_pages, max_items).async_collect(self.iter_all_metions(cookies_str, proxies))
+
+    async def get_likesAndcollects(self, cursor: str, cookies_str: str, proxies: dict = None):
+        """
+            获取赞和收藏
+            :param cursor: 你想要获取的赞和收藏的cursor
+            :param cookies_str: 你的cookies
+            返回赞和收藏
+        """
+        res_json = None
+        try:
+            api = "/api/sns/web/v1/you/likes"
+            params = {
+                "num": "20",
+                "cursor": cursor
+            }
+            splice_api = splice_str(api, params)
+            res_json = await self._request('GET', splice_api, cookies_str, '', proxies)
+            success, msg = res_json["success"], res_json["msg"]
+        except Exception as e:
+            success = False
+            msg = str(e)
+        return success, msg, res_json
+
+    async def iter_all_likesAndcollects(self, cookies_str: str, proxies: dict = None, cursor: str = ''):
+        """
+            逐页获取赞和收藏, 每拿到一页 yield 一次 (messages, cursor, has_more), 不在内存里攒全部结果
+            :param cookies_str: 你的cookies
+            :param cursor: 开始翻页的位置, 传入上次 yield 的 cursor 可以接着翻
+            请求失败时抛出异常
+        """
+        while True:
+            success, msg, res_json = await self.get_likesAndcollects(cursor, cookies_str, proxies)
+            if not success:
+                raise Exception(msg)
+            if 'cursor' not in res_json["data"]:
+                return
+            cursor = str(res_json["data"]["cursor"])
+            yield res_json["data"]["message_list"], cursor, res_json["data"]["has_more"]
+            if not res_json["data"]["has_more"]:
+                return
+
+    async def get_all_likesAndcollects(self, cookies_str: str, proxies: dict = None, deadline: float = None, max_pages: int = None, max_items: int = None):
+        """
+            获取全部的赞和收藏
+            :param cookies_str: 你的cookies
+            :param deadline: 时间预算(秒), 用完后返回已经拿到的部分结果
+            :param max_pages: 最多请求的页数
+            :param max_items: 最多返回的条数
+            返回全部的赞和收藏
+        """
+        return await Budget(deadline, max_pages, max_items).async_collect(self.iter_all_likesAndcollects(cookies_str, proxies))
+
+    async def get_new_connections(self, cursor: str, cookies_str: str, proxies: dict = None):
+        """
+            获取新增关注
+            :param cursor: 你想要获取的新增关注的cursor
+            :param cookies_str: 你的cookies
+            返回新增关注
+        """
+        res_json = None
+        try:
+            api = "/api/sns/web/v1/you/connections"
+            params = {
+                "num": "20",
+                "cursor": cursor
+            }
+            splice_api = splice_str(api, params)
+            res_json = await self._request('GET', splice_api, cookies_str, '', proxies)
+            success, msg = res_json["success"], res_json["msg"]
+        except Exception as e:
+            success = False
+            msg = str(e)
+        return success, msg, res_json
+
+    async def iter_all_new_connections(self, cookies_str: str, proxies: dict = None, cursor: str = ''):
+        """
+            逐页获取新增关注, 每拿到一页 yield 一次 (messages, cursor, has_more), 不在内存里攒全部结果
+            :param cookies_str: 你的cookies
+            :param cursor: 开始翻页的位置, 传入上次 yield 的 cursor 可以接着翻
+            请求失败时抛出异常
+        """
+        while True:
+            success, msg, res_json = await self.get_new_connections(cursor, cookies_str, proxies)
+            if not success:
+                raise Exception(msg)
+            if 'cursor' not in res_json["data"]:
+                return
+            cursor = str(res_json["data"]["cursor"])
+            yield res_json["data"]["message_list"], cursor, res_json["data"]["has_more"]
+            if not res_json["data"]["has_more"]:
+                return
+
+    async def get_all_new_connections(self, cookies_str: str, proxies: dict = None, deadline: float = None, max_pages: int = None, max_items: int = None):
+        """
+            获取全部的新增关注
+            :param cookies_str: 你的cookies
+            :param deadline: 时间预算(秒), 用完后返回已经拿到的部分结果
+            :param max_pages: 最多请求的页数
+            :param max_items: 最多返回的条数
+            返回全部的新增关注
+        """
+        return await Budget(deadline, max_pages, max_items).async_collect(self.iter_all_new_connections(cookies_str, proxies))
+
+    async def get_note_no_water_video(self, note_id, proxies: dict = None):
+        """
+            获取笔记无水印视频
+            :param note_id: 你想要获取的笔记的id
+            :param proxies: 代理, 可以是 ProxyPool
+            返回笔记无水印视频
+            不需要登录, 按匿名账号限速
+        """
+        success = True
+        msg = '成功'
+        video_addr = None
+        try:
+            headers = get_common_headers()
+            api = f"/explore/{note_id}"
+            url = "https://www.xiaohongshu.com" + api
+            response = await async_execute(lambda attempt, timeout: self._transport_request('GET', url, proxies, headers=headers, timeout=timeout), self.retry_policy, lambda: self.rate_limiter.async_acquire(None, api))
+            res = response.text
+            video_addr = re.findall(r'<meta name="og:video" content="(.*?)">', res)[0]
+        except Exception as e:
+            success = False
+            msg = str(e)
+        return success, msg, video_addr
+
+    @staticmethod
+    async def get_note_no_water_img(img_url):
+        """
+            获取笔记无水印图片
+            :param img_url: 你想要获取的图片的url
+            返回笔记无水印图片
+        """
+        return XHS_Apis.get_note_no_water_img(img_url)
+
+if __name__ == '__main__':
+    """
+        此文件为小红书异步api的使用示例
+    """
+    async def main():
+        cookies_str = r''
+        async with AsyncXHS_Apis() as xhs_apis:
+            # 并发获取多个笔记信息
+            note_urls = [
+                r'https://www.xiaohongshu.com/explore/67d7c713000000000900e391?xsec_token=AB1ACxbo5cevHxV_bWibTmK8R1DDz0NnAW1PbFZLABXtE=&xsec_source=pc_user',
+            ]
+            results = await asyncio.gather(*[xhs_apis.get_note_info(note_url, cookies_str) for note_url in note_urls])
+            for success, msg, note_info in results:
+                logger.info(f'获取笔记信息结果 {json.dumps(note_info, ensure_ascii=False)}: {success}, msg: {msg}')
+    asyncio.run(main())
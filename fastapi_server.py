@@ -1,5 +1,6 @@
 # encoding: utf-8
 from fastapi import FastAPI, HTTPException, Query, Path
+from fastapi.responses import JSONResponse, ORJSONResponse
 from typing import Optional, List, Dict, Any
 from pydantic import BaseModel
 import uvicorn
@@ -7,28 +8,51 @@ import json
 import os
 
 from apis.xhs_pc_apis import XHS_Apis
+from xhs_utils import json_util
+from xhs_utils.cookie_pool import load_cookies
+from xhs_utils.proxy_pool import load_proxies
+from xhs_utils.xhs_util import warmup
 
 # 创建FastAPI应用实例
 app = FastAPI(
     title="小红书API接口",
     description="基于小红书PC端API的FastAPI封装，提供用户信息、笔记搜索、评论获取等功能",
-    version="1.0.0"
+    version="1.0.0",
+    # 安装了 orjson 时用 orjson 序列化响应, 评论和搜索结果这类大响应更快
+    default_response_class=ORJSONResponse if json_util.orjson is not None else JSONResponse,
 )
 
 # 创建API实例
 xhs_api = XHS_Apis()
 
+# 设置了 XHS_COOKIES_PATH 时使用多账号池, 否则使用 XHS_COOKIES
+cookie_pool = load_cookies()
+
+# 设置了 XHS_PROXIES_PATH 时, 请求里没有指定代理就从代理池里挑
+proxy_pool = load_proxies()
+
 
 def get_cookies_from_env() -> str:
     """
     从参数或环境变量获取cookies
     """
+    if cookie_pool is not None:
+        return cookie_pool
     cookies = os.environ.get('XHS_COOKIES', '')
     if not cookies:
         raise HTTPException(status_code=400, detail="未设置cookies，请先调用 /api/set_cookies 接口设置")
     return cookies
 
 
+@app.on_event("startup")
+def warmup_signer():
+    """
+    设置 XHS_SIGN_WARMUP 时在启动阶段预热签名后端, 否则在第一次签名时再创建
+    """
+    if os.environ.get('XHS_SIGN_WARMUP'):
+        warmup()
+
+
 # ============== 首页相关接口 ==============
 
 @app.get("/api/homefeed/category", tags=["首页"])
@@ -40,7 +64,7 @@ async def get_homefeed_category(
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_homefeed_all_channel(cookies, proxies_dict)
         if not success:
             raise HTTPException(status_code=400, detail=msg)
@@ -64,7 +88,7 @@ async def get_homefeed_recommend(
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_homefeed_recommend(
             category, cursor_score, refresh_type, note_index, cookies, proxies_dict
         )
@@ -88,7 +112,7 @@ async def get_homefeed_recommend_by_num(
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_homefeed_recommend_by_num(
             category, num, cookies, proxies_dict
         )
@@ -111,7 +135,7 @@ async def get_user_info(
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_user_info(user_id, cookies, proxies_dict)
         if not success:
             raise HTTPException(status_code=400, detail=msg)
@@ -129,7 +153,7 @@ async def get_user_self_info(
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_user_self_info(cookies, proxies_dict)
         if not success:
             raise HTTPException(status_code=400, detail=msg)
@@ -147,7 +171,7 @@ async def get_user_self_info2(
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_user_self_info2(cookies, proxies_dict)
         if not success:
             raise HTTPException(status_code=400, detail=msg)
@@ -169,7 +193,7 @@ async def get_user_notes(
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_user_note_info(
             user_id, cursor, cookies, xsec_token, xsec_source, proxies_dict
         )
@@ -190,7 +214,7 @@ async def get_user_all_notes(
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_user_all_notes(user_url, cookies, proxies_dict)
         if not success:
             raise HTTPException(status_code=400, detail=msg)
@@ -212,7 +236,7 @@ async def get_user_likes(
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_user_like_note_info(
             user_id, cursor, cookies, xsec_token, xsec_source, proxies_dict
         )
@@ -233,7 +257,7 @@ async def get_user_all_likes(
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_user_all_like_note_info(user_url, cookies, proxies_dict)
         if not success:
             raise HTTPException(status_code=400, detail=msg)
@@ -255,7 +279,7 @@ async def get_user_collects(
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_user_collect_note_info(
             user_id, cursor, cookies, xsec_token, xsec_source, proxies_dict
         )
@@ -276,7 +300,7 @@ async def get_user_all_collects(
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_user_all_collect_note_info(user_url, cookies, proxies_dict)
         if not success:
             raise HTTPException(status_code=400, detail=msg)
@@ -297,7 +321,7 @@ async def get_note_info(
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_note_info(url, cookies, proxies_dict)
         if not success:
             raise HTTPException(status_code=400, detail=msg)
@@ -350,7 +374,7 @@ async def get_search_keyword(
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_search_keyword(word, cookies, proxies_dict)
         if not success:
             raise HTTPException(status_code=400, detail=msg)
@@ -376,7 +400,7 @@ async def search_notes(
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         geo_dict = json.loads(geo) if geo else ""
         success, msg, data = xhs_api.search_note(
             query, cookies, page, sort_type, note_type, note_time, note_range, pos_distance, geo_dict, proxies_dict
@@ -405,7 +429,7 @@ async def search_some_notes(
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         geo_dict = json.loads(geo) if geo else ""
         success, msg, data = xhs_api.search_some_note(
             query, num, cookies, sort_type, note_type, note_time, note_range, pos_distance, geo_dict, proxies_dict
@@ -428,7 +452,7 @@ async def search_users(
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.search_user(query, cookies, page, proxies_dict)
         if not success:
             raise HTTPException(status_code=400, detail=msg)
@@ -448,7 +472,7 @@ async def search_some_users(
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.search_some_user(query, num, cookies, proxies_dict)
         if not success:
             raise HTTPException(status_code=400, detail=msg)
@@ -471,7 +495,7 @@ async def get_note_comments(
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_note_out_comment(note_id, cursor, xsec_token, cookies, proxies_dict)
         if not success:
             raise HTTPException(status_code=400, detail=msg)
@@ -491,7 +515,7 @@ async def get_note_all_comments(
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_note_all_out_comment(note_id, xsec_token, cookies, proxies_dict)
         if not success:
             raise HTTPException(status_code=400, detail=msg)
@@ -510,7 +534,7 @@ async def get_note_all_comment(
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_note_all_comment(url, cookies, proxies_dict)
         if not success:
             raise HTTPException(status_code=400, detail=msg)
@@ -530,7 +554,7 @@ async def get_unread_message(
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_unread_message(cookies, proxies_dict)
         if not success:
             raise HTTPException(status_code=400, detail=msg)
@@ -549,7 +573,7 @@ async def get_mentions(
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_metions(cursor, cookies, proxies_dict)
         if not success:
             raise HTTPException(status_code=400, detail=msg)
@@ -567,7 +591,7 @@ async def get_all_mentions(
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_all_metions(cookies, proxies_dict)
         if not success:
             raise HTTPException(status_code=400, detail=msg)
@@ -586,7 +610,7 @@ async def get_likes(
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_likesAndcollects(cursor, cookies, proxies_dict)
         if not success:
             raise HTTPException(status_code=400, detail=msg)
@@ -604,7 +628,7 @@ async def get_all_likes(
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_all_likesAndcollects(cookies, proxies_dict)
         if not success:
             raise HTTPException(status_code=400, detail=msg)
@@ -623,7 +647,7 @@ async def get_connections(
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_new_connections(cursor, cookies, proxies_dict)
         if not success:
             raise HTTPException(status_code=400, detail=msg)
@@ -641,7 +665,7 @@ async def get_all_connections(
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_all_new_connections(cookies, proxies_dict)
         if not success:
             raise HTTPException(status_code=400, detail=msg)
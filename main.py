@@ -3,7 +3,8 @@ import os
 from loguru import logger
 from apis.xhs_pc_apis import XHS_Apis
 from xhs_utils.common_util import init
-from xhs_utils.data_util import handle_note_info, download_note, save_to_xlsx
+from xhs_utils.data_util import handle_note_info, handle_search_item, search_item_url, download_note, XlsxWriter, SEARCH_ITEM_FIELDS
+from xhs_utils.pipeline_util import Pipeline
 
 
 class Data_Spider():
@@ -30,57 +31,106 @@ class Data_Spider():
         logger.info(f'爬取笔记信息 {note_url}: {success}, msg: {msg}')
         return success, msg, note_info
 
-    def spider_some_note(self, notes: list, cookies_str: str, base_path: dict, save_choice: str, excel_name: str = '', proxies=None):
+    def spider_some_note(self, notes, cookies_str: str, base_path: dict, save_choice: str, excel_name: str = '', proxies=None, workers: int = 1, media_workers: int = 1, queue_size: int = 100, sink=None):
         """
         爬取一些笔记的信息
-        :param notes:
+        获取详情, 下载媒体文件和保存三个阶段同时进行, 阶段之间用长度为 queue_size 的队列连接, notes 可以是边翻页边产出链接的生成器
+        :param notes: 笔记链接列表或生成器, 也可以直接放搜索结果里的笔记卡片, 用 handle_search_item 生成笔记信息, 不再请求笔记详情
         :param cookies_str:
         :param base_path:
-        :return:
+        :param workers: 同时获取笔记详情的线程数, 请求仍然受账号限速约束, 结果保持 notes 的顺序
+        :param media_workers: 同时下载媒体文件的笔记数
+        :param queue_size: 阶段之间的队列长度, 下游处理不过来时上游等待
+        :param sink: 额外的输出, sink(note_info) 在保存阶段按 notes 的顺序逐个调用, 例如写入数据库
+        :return: 成功的笔记信息列表, 失败的笔记 [{'url': 笔记链接, 'stage': 失败的阶段, 'msg': 失败原因}]
         """
         if (save_choice == 'all' or save_choice == 'excel') and excel_name == '':
             raise ValueError('excel_name 不能为空')
-        note_list = []
-        for note_url in notes:
+        media_failed_list = []
+
+        def fetch(note_url):
+            # 笔记卡片在这一阶段处理, 一个卡片缺字段只让这个笔记失败
+            if isinstance(note_url, dict):
+                return handle_search_item(note_url)
             success, msg, note_info = self.spider_note(note_url, cookies_str, proxies)
-            if note_info is not None and success:
-                note_list.append(note_info)
-        for note_info in note_list:
-            if save_choice == 'all' or 'media' in save_choice:
-                download_note(note_info, base_path['media'], save_choice)
+            if note_info is None or not success:
+                raise Exception(msg)
+            return note_info
+
+        def download(note_info):
+            # 媒体下载失败不影响保存笔记信息
+            try:
+                _, results = download_note(note_info, base_path['media'], save_choice)
+                errors = [f"{result['url']}: {result['msg']}" for result in results if not result['success']]
+            except Exception as e:
+                errors = [str(e)]
+            if errors:
+                logger.warning(f'下载笔记 {note_info["note_url"]} 的媒体文件失败: {errors}')
+                media_failed_list.append({'url': note_info['note_url'], 'stage': 'media', 'msg': '; '.join(errors)})
+            return note_info
+
+        writer = None
         if save_choice == 'all' or save_choice == 'excel':
-            file_path = os.path.abspath(os.path.join(base_path['excel'], f'{excel_name}.xlsx'))
-            save_to_xlsx(note_list, file_path)
+            writer = XlsxWriter(os.path.abspath(os.path.join(base_path['excel'], f'{excel_name}.xlsx')))
+
+        def save(note_info):
+            if writer is not None:
+                writer.append(note_info)
+            if sink is not None:
+                sink(note_info)
+            return note_info
 
+        pipeline = Pipeline(queue_size).add('detail', fetch, workers)
+        if save_choice == 'all' or 'media' in save_choice:
+            pipeline.add('media', download, media_workers)
+        if writer is not None or sink is not None:
+            pipeline.add('sink', save, ordered=True)
+        note_list = pipeline.run(notes)
+        if writer is not None:
+            writer.close()
+        failed_list = [{'url': search_item_url(failed['item']) if isinstance(failed['item'], dict) else failed['item'], 'stage': failed['stage'], 'msg': failed['msg']} for failed in pipeline.failed] + media_failed_list
+        if failed_list:
+            logger.warning(f'{len(failed_list)} 个笔记爬取失败: {failed_list}')
+        return note_list, failed_list
 
-    def spider_user_all_note(self, user_url: str, cookies_str: str, base_path: dict, save_choice: str, excel_name: str = '', proxies=None):
+
+    def spider_user_all_note(self, user_url: str, cookies_str: str, base_path: dict, save_choice: str, excel_name: str = '', proxies=None, workers: int = 1, media_workers: int = 1):
         """
         爬取一个用户的所有笔记
+        边翻页边获取笔记详情和下载媒体文件, 不等全部翻完
         :param user_url:
         :param cookies_str:
         :param base_path:
+        :param workers: 同时获取笔记详情的线程数
+        :param media_workers: 同时下载媒体文件的笔记数
         :return:
         """
         note_list = []
-        try:
-            success, msg, all_note_info = self.xhs_apis.get_user_all_notes(user_url, cookies_str, proxies)
-            if success:
-                logger.info(f'用户 {user_url} 作品数量: {len(all_note_info)}')
-                for simple_note_info in all_note_info:
+
+        def list_notes():
+            for notes, cursor, has_more in self.xhs_apis.iter_user_all_notes(user_url, cookies_str, proxies):
+                for simple_note_info in notes:
                     note_url = f"https://www.xiaohongshu.com/explore/{simple_note_info['note_id']}?xsec_token={simple_note_info['xsec_token']}"
                     note_list.append(note_url)
+                    yield note_url
+
+        try:
             if save_choice == 'all' or save_choice == 'excel':
                 excel_name = user_url.split('/')[-1].split('?')[0]
-            self.spider_some_note(note_list, cookies_str, base_path, save_choice, excel_name, proxies)
+            _, failed_list = self.spider_some_note(list_notes(), cookies_str, base_path, save_choice, excel_name, proxies, workers, media_workers)
+            logger.info(f'用户 {user_url} 作品数量: {len(note_list)}')
+            source_failed = [failed['msg'] for failed in failed_list if failed['stage'] == 'source']
+            success, msg = not source_failed, source_failed[0] if source_failed else 'success'
         except Exception as e:
             success = False
             msg = e
         logger.info(f'爬取用户所有视频 {user_url}: {success}, msg: {msg}')
         return note_list, success, msg
 
-    def spider_some_search_note(self, query: str, require_num: int, cookies_str: str, base_path: dict, save_choice: str, sort_type_choice=0, note_type=0, note_time=0, note_range=0, pos_distance=0, geo: dict = None,  excel_name: str = '', proxies=None):
+    def spider_some_search_note(self, query: str, require_num: int, cookies_str: str, base_path: dict, save_choice: str, sort_type_choice=0, note_type=0, note_time=0, note_range=0, pos_distance=0, geo: dict = None,  excel_name: str = '', proxies=None, workers: int = 1, media_workers: int = 1, fields: list = None):
         """
             指定数量搜索笔记，设置排序方式和笔记类型和笔记数量
+            边翻页边获取笔记详情和下载媒体文件, 不等全部翻完
             :param query 搜索的关键词
             :param require_num 搜索的数量
             :param cookies_str 你的cookies
@@ -90,20 +140,40 @@ class Data_Spider():
             :param note_time 笔记时间 0 不限, 1 一天内, 2 一周内天, 3 半年内
             :param note_range 笔记范围 0 不限, 1 已看过, 2 未看过, 3 已关注
             :param pos_distance 位置距离 0 不限, 1 同城, 2 附近 指定这个必须要指定 geo
+            :param workers 同时获取笔记详情的线程数
+            :param media_workers 同时下载媒体文件的笔记数
+            :param fields 需要的笔记字段, 都在搜索结果的笔记卡片里(见 SEARCH_ITEM_FIELDS)且不下载媒体文件时直接用卡片生成笔记信息, 不再逐个请求笔记详情; 默认获取全部字段
             返回搜索的结果
         """
         note_list = []
+        use_search_item = fields is not None and set(fields) <= SEARCH_ITEM_FIELDS and not (save_choice == 'all' or 'media' in save_choice)
+
+        def list_notes():
+            pages = self.xhs_apis.iter_search_note(query, cookies_str, sort_type_choice, note_type, note_time, note_range, pos_distance, geo, proxies)
+            count = 0
+            try:
+                if require_num <= 0:
+                    return
+                for notes, cursor, has_more in pages:
+                    for note in notes:
+                        count += 1
+                        if note['model_type'] == "note":
+                            note_url = search_item_url(note)
+                            note_list.append(note_url)
+                            yield note if use_search_item else note_url
+                        # 数量够了立即停止, 不再多请求一页
+                        if count >= require_num:
+                            return
+            finally:
+                pages.close()
+
         try:
-            success, msg, notes = self.xhs_apis.search_some_note(query, require_num, cookies_str, sort_type_choice, note_type, note_time, note_range, pos_distance, geo, proxies)
-            if success:
-                notes = list(filter(lambda x: x['model_type'] == "note", notes))
-                logger.info(f'搜索关键词 {query} 笔记数量: {len(notes)}')
-                for note in notes:
-                    note_url = f"https://www.xiaohongshu.com/explore/{note['id']}?xsec_token={note['xsec_token']}"
-                    note_list.append(note_url)
             if save_choice == 'all' or save_choice == 'excel':
                 excel_name = query
-            self.spider_some_note(note_list, cookies_str, base_path, save_choice, excel_name, proxies)
+            _, failed_list = self.spider_some_note(list_notes(), cookies_str, base_path, save_choice, excel_name, proxies, workers, media_workers)
+            logger.info(f'搜索关键词 {query} 笔记数量: {len(note_list)}')
+            source_failed = [failed['msg'] for failed in failed_list if failed['stage'] == 'source']
+            success, msg = not source_failed, source_failed[0] if source_failed else 'success'
         except Exception as e:
             success = False
             msg = e
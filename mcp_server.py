@@ -7,6 +7,9 @@ import os
 from typing import Any, Dict, Optional
 from fastmcp import FastMCP
 from apis.xhs_pc_apis import XHS_Apis
+from xhs_utils.cookie_pool import load_cookies
+from xhs_utils.proxy_pool import load_proxies
+from xhs_utils.xhs_util import warmup
 
 # 创建MCP服务器实例
 mcp = FastMCP("小红书API MCP服务器")
@@ -14,11 +17,19 @@ mcp = FastMCP("小红书API MCP服务器")
 # 创建API实例
 xhs_api = XHS_Apis()
 
+# 设置了 XHS_COOKIES_PATH 时使用多账号池, 否则使用 XHS_COOKIES
+cookie_pool = load_cookies()
+
+# 设置了 XHS_PROXIES_PATH 时, 请求里没有指定代理就从代理池里挑
+proxy_pool = load_proxies()
+
 
 def get_cookies_from_env() -> str:
     """
     从环境变量获取cookies
     """
+    if cookie_pool is not None:
+        return cookie_pool
     cookies = os.environ.get('XHS_COOKIES', '')
     if not cookies:
         raise ValueError("未设置cookies，请先调用 /api/set_cookies 接口设置")
@@ -38,7 +49,7 @@ def get_homefeed_category(proxies: Optional[str] = None) -> Dict[str, Any]:
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_homefeed_all_channel(cookies, proxies_dict)
         return {"success": success, "message": msg, "data": data}
     except Exception as e:
@@ -68,7 +79,7 @@ def get_homefeed_recommend(
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_homefeed_recommend(
             category, cursor_score, refresh_type, note_index, cookies, proxies_dict
         )
@@ -92,7 +103,7 @@ def get_homefeed_recommend_by_num(category: str = "", num: int = 10, proxies: Op
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_homefeed_recommend_by_num(
             category, num, cookies, proxies_dict
         )
@@ -115,7 +126,7 @@ def get_user_info(user_id: str, proxies: Optional[str] = None) -> Dict[str, Any]
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_user_info(user_id, cookies, proxies_dict)
         return {"success": success, "message": msg, "data": data}
     except Exception as e:
@@ -135,7 +146,7 @@ def get_user_self_info(proxies: Optional[str] = None) -> Dict[str, Any]:
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_user_self_info(cookies, proxies_dict)
         return {"success": success, "message": msg, "data": data}
     except Exception as e:
@@ -155,7 +166,7 @@ def get_user_self_info2(proxies: Optional[str] = None) -> Dict[str, Any]:
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_user_self_info2(cookies, proxies_dict)
         return {"success": success, "message": msg, "data": data}
     except Exception as e:
@@ -185,7 +196,7 @@ def get_user_notes(
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_user_note_info(
             user_id, cursor, cookies, xsec_token, xsec_source, proxies_dict
         )
@@ -208,7 +219,7 @@ def get_user_all_notes(user_url: str, proxies: Optional[str] = None) -> Dict[str
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_user_all_notes(user_url, cookies, proxies_dict)
         return {"success": success, "message": msg, "data": data}
     except Exception as e:
@@ -238,7 +249,7 @@ def get_user_likes(
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_user_like_note_info(
             user_id, cursor, cookies, xsec_token, xsec_source, proxies_dict
         )
@@ -261,7 +272,7 @@ def get_user_all_likes(user_url: str, proxies: Optional[str] = None) -> Dict[str
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_user_all_like_note_info(user_url, cookies, proxies_dict)
         return {"success": success, "message": msg, "data": data}
     except Exception as e:
@@ -291,7 +302,7 @@ def get_user_collects(
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_user_collect_note_info(
             user_id, cursor, cookies, xsec_token, xsec_source, proxies_dict
         )
@@ -314,7 +325,7 @@ def get_user_all_collects(user_url: str, proxies: Optional[str] = None) -> Dict[
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_user_all_collect_note_info(user_url, cookies, proxies_dict)
         return {"success": success, "message": msg, "data": data}
     except Exception as e:
@@ -335,7 +346,7 @@ def get_note_info(url: str, proxies: Optional[str] = None) -> Dict[str, Any]:
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_note_info(url, cookies, proxies_dict)
         return {"success": success, "message": msg, "data": data}
     except Exception as e:
@@ -392,7 +403,7 @@ def get_search_keyword(word: str, proxies: Optional[str] = None) -> Dict[str, An
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_search_keyword(word, cookies, proxies_dict)
         return {"success": success, "message": msg, "data": data}
     except Exception as e:
@@ -430,7 +441,7 @@ def search_notes(
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         geo_dict = json.loads(geo) if geo else ""
         success, msg, data = xhs_api.search_note(
             query, cookies, page, sort_type, note_type, note_time, note_range, pos_distance, geo_dict, proxies_dict
@@ -471,7 +482,7 @@ def search_some_notes(
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         geo_dict = json.loads(geo) if geo else ""
         success, msg, data = xhs_api.search_some_note(
             query, num, cookies, sort_type, note_type, note_time, note_range, pos_distance, geo_dict, proxies_dict
@@ -496,7 +507,7 @@ def search_users(query: str, page: int = 1, proxies: Optional[str] = None) -> Di
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.search_user(query, cookies, page, proxies_dict)
         return {"success": success, "message": msg, "data": data}
     except Exception as e:
@@ -518,7 +529,7 @@ def search_some_users(query: str, num: int = 10, proxies: Optional[str] = None)
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.search_some_user(query, num, cookies, proxies_dict)
         return {"success": success, "message": msg, "data": data}
     except Exception as e:
@@ -546,7 +557,7 @@ def get_note_comments(
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_note_out_comment(note_id, cursor, xsec_token, cookies, proxies_dict)
         return {"success": success, "message": msg, "data": data}
     except Exception as e:
@@ -568,7 +579,7 @@ def get_note_all_comments(note_id: str, xsec_token: str = "", proxies: Optional[
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_note_all_out_comment(note_id, xsec_token, cookies, proxies_dict)
         return {"success": success, "message": msg, "data": data}
     except Exception as e:
@@ -588,7 +599,7 @@ def get_note_all_comment(url: str, proxies: Optional[str] = None) -> Dict[str, A
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_note_all_comment(url, cookies, proxies_dict)
         return {"success": success, "message": msg, "data": data}
     except Exception as e:
@@ -608,7 +619,7 @@ def get_unread_message(proxies: Optional[str] = None) -> Dict[str, Any]:
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_unread_message(cookies, proxies_dict)
         return {"success": success, "message": msg, "data": data}
     except Exception as e:
@@ -629,7 +640,7 @@ def get_mentions(cursor: str = "", proxies: Optional[str] = None) -> Dict[str, A
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_metions(cursor, cookies, proxies_dict)
         return {"success": success, "message": msg, "data": data}
     except Exception as e:
@@ -649,7 +660,7 @@ def get_all_mentions(proxies: Optional[str] = None) -> Dict[str, Any]:
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_all_metions(cookies, proxies_dict)
         return {"success": success, "message": msg, "data": data}
     except Exception as e:
@@ -670,7 +681,7 @@ def get_likes(cursor: str = "", proxies: Optional[str] = None) -> Dict[str, Any]
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_likesAndcollects(cursor, cookies, proxies_dict)
         return {"success": success, "message": msg, "data": data}
     except Exception as e:
@@ -690,7 +701,7 @@ def get_all_likes(proxies: Optional[str] = None) -> Dict[str, Any]:
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_all_likesAndcollects(cookies, proxies_dict)
         return {"success": success, "message": msg, "data": data}
     except Exception as e:
@@ -711,7 +722,7 @@ def get_connections(cursor: str = "", proxies: Optional[str] = None) -> Dict[str
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_new_connections(cursor, cookies, proxies_dict)
         return {"success": success, "message": msg, "data": data}
     except Exception as e:
@@ -731,7 +742,7 @@ def get_all_connections(proxies: Optional[str] = None) -> Dict[str, Any]:
     """
     try:
         cookies = get_cookies_from_env()
-        proxies_dict = json.loads(proxies) if proxies else None
+        proxies_dict = json.loads(proxies) if proxies else proxy_pool
         success, msg, data = xhs_api.get_all_new_connections(cookies, proxies_dict)
         return {"success": success, "message": msg, "data": data}
     except Exception as e:
@@ -739,5 +750,8 @@ def get_all_connections(proxies: Optional[str] = None) -> Dict[str, Any]:
 
 
 if __name__ == "__main__":
+    # 设置 XHS_SIGN_WARMUP 时预热签名后端, 否则在第一次签名时再创建
+    if os.environ.get('XHS_SIGN_WARMUP'):
+        warmup()
     # 启动MCP服务器
     mcp.run(transport='stdio')
@@ -52,3 +52,10 @@ function get_request_headers_params(api, data, a1){
         "xt": xt,
     }
 }
+
+if (typeof module !== "undefined") {
+    module.exports = {
+        get_xs,
+        get_request_headers_params,
+    };
+}
@@ -0,0 +1,46 @@
+// Long-lived signing worker
+// Usage:
+//   node xhs_sign_worker.js <sign_module.js>
+// Protocol (one JSON object per line on stdin / stdout):
+//   request:  {"id": 1, "method": "get_request_headers_params", "args": [api, data, a1, method]}
+//   batch:    {"id": 2, "batch": [{"method": "...", "args": [...]}, ...]}
+//   response: {"id": 1, "result": {...}} or {"id": 1, "error": "..."}, batch result is an array
+
+const path = require("path");
+const readline = require("readline");
+
+const signModule = require(path.resolve(process.argv[2]));
+
+function handle(req) {
+  if (req.batch) {
+    return req.batch.map(handle);
+  }
+  if (req.method === "ping") {
+    return "pong";
+  }
+  const fn = signModule[req.method];
+  if (typeof fn !== "function") {
+    throw new Error("unknown method: " + req.method);
+  }
+  return fn.apply(null, req.args || []);
+}
+
+const rl = readline.createInterface({ input: process.stdin, terminal: false });
+rl.on("line", (line) => {
+  if (!line) return;
+  let req;
+  try {
+    req = JSON.parse(line);
+  } catch (e) {
+    process.stdout.write(JSON.stringify({ id: null, error: "bad request: " + e.message }) + "\n");
+    return;
+  }
+  let res;
+  try {
+    res = { id: req.id, result: handle(req) };
+  } catch (e) {
+    res = { id: req.id, error: String(e && e.stack ? e.stack : e) };
+  }
+  process.stdout.write(JSON.stringify(res) + "\n");
+});
+rl.on("close", () => process.exit(0));
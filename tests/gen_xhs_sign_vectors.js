@@ -0,0 +1,51 @@
+// 用 static/xhs_xs_xsc_56.js 重新生成 xhs_sign_vectors.json 里的 expected
+// 固定 crypto.randomBytes 和 Date.now, 与 test_xhs_sign_util.py 里 _rand32/_now_ms 的取值一致
+// 用法: node tests/gen_xhs_sign_vectors.js
+const fs = require("fs");
+const path = require("path");
+const vm = require("vm");
+const realCrypto = require("crypto");
+
+const vectorsPath = path.join(__dirname, "xhs_sign_vectors.json");
+const vectors = JSON.parse(fs.readFileSync(vectorsPath, "utf-8"));
+let index = 0;
+const crypto = {
+  createHash: realCrypto.createHash.bind(realCrypto),
+  randomBytes(size) {
+    const buf = Buffer.alloc(size);
+    buf.writeUInt32LE(vectors.rand32[index++ % vectors.rand32.length]);
+    return buf;
+  },
+};
+class FixedDate extends Date {
+  constructor(...args) {
+    args.length ? super(...args) : super(vectors.now_ms);
+  }
+  static now() {
+    return vectors.now_ms;
+  }
+}
+const source = fs.readFileSync(path.join(__dirname, "..", "static", "xhs_xs_xsc_56.js"), "utf-8");
+const lib = vm.runInNewContext(source + "\n;({ signXs, XsCommon, gens9, get_request_headers_params })", {
+  require: (name) => (name === "crypto" ? crypto : require(name)),
+  module: {},
+  Buffer,
+  Date: FixedDate,
+  encodeURIComponent,
+});
+
+for (const c of vectors.get_request_headers_params) {
+  index = 0;
+  c.expected = lib.get_request_headers_params(c.api, c.data, c.a1, c.method);
+}
+for (const c of vectors.sign_xs) {
+  index = 0;
+  c.expected = lib.signXs(c.method, c.api, c.a1, c.appid, c.data);
+}
+for (const c of vectors.xs_common) {
+  c.expected = lib.XsCommon(c.a1, c.xs, c.xt);
+}
+for (const c of vectors.gens9) {
+  c.expected = lib.gens9(c.input);
+}
+fs.writeFileSync(vectorsPath, JSON.stringify(vectors, null, 2) + "\n");
@@ -0,0 +1,71 @@
+import json
+from collections import Counter
+from http.cookiejar import CookieJar
+import httpx
+from xhs_utils.http_util import NoStoreCookiePolicy, httpx_timeout
+
+
+class AsyncHttpTransport():
+    """
+        基于 httpx.AsyncClient 的异步http传输层, 每组代理对应一个共享连接池的 client
+        :param max_connections: 每个 client 的最大连接数, 同时也是最大并发请求数
+        :param max_keepalive_connections: 保持的空闲 keep-alive 连接数
+        :param keepalive_expiry: 空闲连接保持时间(秒)
+        :param http2: 启用 HTTP/2, 并发请求共用一条多路复用连接, 需要安装 httpx[http2]
+    """
+    def __init__(self, max_connections=100, max_keepalive_connections=20, keepalive_expiry=30.0, http2=False):
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive_connections, keepalive_expiry=keepalive_expiry)
+        self.http2 = http2
+        self._clients = {}
+        self.protocols = Counter()
+
+    @staticmethod
+    def _proxy_key(proxies):
+        if not proxies:
+            return ''
+        return json.dumps(proxies, sort_keys=True)
+
+    def _new_client(self, proxies):
+        mounts = None
+        if proxies:
+            # requests 风格的 {'http': ..., 'https': ...} 转成 httpx 的 mounts
+            mounts = {f'{scheme}://': httpx.AsyncHTTPTransport(proxy=proxy, http2=self.http2, limits=self.limits) for scheme, proxy in proxies.items() if proxy}
+        return httpx.AsyncClient(
+            http2=self.http2,
+            limits=self.limits,
+            mounts=mounts,
+            cookies=httpx.Cookies(CookieJar(policy=NoStoreCookiePolicy())),
+            timeout=None,
+        )
+
+    def client(self, proxies: dict = None):
+        key = self._proxy_key(proxies)
+        client = self._clients.get(key)
+        if client is None:
+            client = self._clients[key] = self._new_client(proxies)
+        return client
+
+    async def request(self, method, url, proxies: dict = None, **kwargs):
+        if 'timeout' in kwargs:
+            kwargs['timeout'] = httpx_timeout(kwargs['timeout'])
+        response = await self.client(proxies).request(method, url, **kwargs)
+        self.protocols[response.http_version] += 1
+        return response
+
+    async def get(self, url, proxies: dict = None, **kwargs):
+        return await self.request('GET', url, proxies, **kwargs)
+
+    async def post(self, url, proxies: dict = None, **kwargs):
+        return await self.request('POST', url, proxies, **kwargs)
+
+    async def aclose(self):
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            await client.aclose()
+
+    def stats(self):
+        """
+            返回连接池数量和各协议版本的响应数
+        """
+        return {'sessions': len(self._clients), 'protocols': dict(self.protocols)}
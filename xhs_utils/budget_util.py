@@ -0,0 +1,172 @@
+import contextvars
+import time
+
+# 当前分页调用的截止时间(time.monotonic), 请求执行器按它收紧每一页的超时
+current_deadline = contextvars.ContextVar('xhs_deadline', default=None)
+# 当前 with 块对应的 Budget, 请求在截止时间前来不及发出时用它标记提前结束
+current_budget = contextvars.ContextVar('xhs_budget', default=None)
+
+
+class DeadlineExceeded(Exception):
+    """
+        超过了分页调用的时间预算
+    """
+
+
+class PageList(list):
+    """
+        分页接口返回的列表, truncated 为 True 表示因为时间/页数/条数预算提前结束, 只包含部分结果
+        cursor 是最后一页之后的位置, 传给对应的 iter_* 方法可以接着翻, 按 max_items 截掉的那部分不会再返回
+    """
+    truncated = False
+    cursor = None
+
+
+class Budget():
+    """
+        分页调用的预算, 任一项用完就停止翻页, 返回已经拿到的结果
+        在 with 块里发出的请求, 超时会被收紧到截止时间之前, 截止时间后不再重试
+        :param deadline: 时间预算(秒)
+        :param max_pages: 最多请求的页数
+        :param max_items: 最多返回的条数
+    """
+    def __init__(self, deadline: float = None, max_pages: int = None, max_items: int = None):
+        self.expires = time.monotonic() + deadline if deadline is not None else None
+        self.max_pages = max_pages
+        self.max_items = max_items
+        self.pages = 0
+        self.truncated = False
+        self._token = None
+
+    def __enter__(self):
+        # 嵌套调用时取更早的截止时间
+        outer = current_deadline.get()
+        expires = self.expires if outer is None or (self.expires is not None and self.expires < outer) else outer
+        self._token = current_deadline.set(expires), current_budget.set(self)
+        return self
+
+    def __exit__(self, *args):
+        current_deadline.reset(self._token[0])
+        current_budget.reset(self._token[1])
+
+    def remaining(self):
+        """
+            剩余的秒数, 没有时间预算时返回 None
+        """
+        if self.expires is None:
+            return None
+        return max(0.0, self.expires - time.monotonic())
+
+    @property
+    def expired(self):
+        return self.expires is not None and time.monotonic() >= self.expires
+
+    def exhausted(self, items):
+        """
+            翻下一页之前检查, 预算用完时标记 truncated 并返回 True
+        """
+        if self.expired or (self.max_pages is not None and self.pages >= self.max_pages) or (self.max_items is not None and len(items) >= self.max_items):
+            self.truncated = True
+        return self.truncated
+
+    def page_failed(self):
+        """
+            某一页请求失败时检查, 失败是因为时间用完(见 deadline_exceeded)则标记 truncated 并返回 True, 调用方返回部分结果
+        """
+        if self.expired:
+            self.truncated = True
+        return self.truncated
+
+    def collect(self, pages, limit: int = None):
+        """
+            按预算消费 iter_* 方法返回的翻页生成器, 把每页的数据攒成一个列表
+            :param pages: 每页 yield (items, cursor, has_more) 的生成器
+            :param limit: 需要的条数, 拿够后停止翻页并截断, 不算提前结束
+            返回 (success, msg, PageList), 某一页失败时 success 为 False, 列表里是失败前拿到的数据; 失败是因为时间用完则返回部分结果
+        """
+        items, cursor = [], None
+        success, msg = True, 'success'
+        with self:
+            try:
+                for page_items, cursor, has_more in pages:
+                    self.pages += 1
+                    items.extend(page_items)
+                    if not has_more or (limit is not None and len(items) >= limit) or self.exhausted(items):
+                        break
+            except Exception as e:
+                success, msg = self.page_failed(), str(e)
+                if success:
+                    msg = f'{msg}, 返回部分结果'
+            finally:
+                pages.close()
+        return success, msg, self.result(items if limit is None else items[:limit], cursor)
+
+    async def async_collect(self, pages, limit: int = None):
+        """
+            collect 的异步版本, pages 是异步生成器
+        """
+        items, cursor = [], None
+        success, msg = True, 'success'
+        with self:
+            try:
+                async for page_items, cursor, has_more in pages:
+                    self.pages += 1
+                    items.extend(page_items)
+                    if not has_more or (limit is not None and len(items) >= limit) or self.exhausted(items):
+                        break
+            except Exception as e:
+                success, msg = self.page_failed(), str(e)
+                if success:
+                    msg = f'{msg}, 返回部分结果'
+            finally:
+                await pages.aclose()
+        return success, msg, self.result(items if limit is None else items[:limit], cursor)
+
+    def result(self, items, cursor=None):
+        """
+            按 max_items 截断, 返回带 truncated 标记和 cursor 的 PageList
+        """
+        if self.max_items is not None and len(items) > self.max_items:
+            self.truncated = True
+            items = items[:self.max_items]
+        page_list = PageList(items)
+        page_list.truncated = self.truncated
+        page_list.cursor = cursor
+        return page_list
+
+
+def clamp_timeout(timeout):
+    """
+        按当前截止时间收紧请求超时, 截止时间已过时抛 DeadlineExceeded
+        :param timeout: 秒数或 (连接超时, 读取超时), None 表示不限
+    """
+    expires = current_deadline.get()
+    if expires is None:
+        return timeout
+    remaining = expires - time.monotonic()
+    if remaining <= 0:
+        raise DeadlineExceeded('超过时间预算')
+    if timeout is None:
+        return remaining
+    if isinstance(timeout, tuple):
+        return tuple(remaining if t is None else min(t, remaining) for t in timeout)
+    return min(timeout, remaining)
+
+
+def deadline_exceeded(msg):
+    """
+        截止时间前来不及发出请求(例如限速等待太久)时调用, 标记当前 Budget 提前结束, 返回要抛出的 DeadlineExceeded
+        接口方法会把异常转成 msg, 所以 Budget 靠这个标记而不是异常类型判断是否返回部分结果
+    """
+    budget = current_budget.get()
+    if budget is not None:
+        budget.truncated = True
+    return DeadlineExceeded(msg)
+
+
+def deadline_allows(delay):
+    """
+        截止时间前是否还来得及等待 delay 秒后重试
+    """
+    expires = current_deadline.get()
+    return expires is None or time.monotonic() + delay < expires
@@ -0,0 +1,176 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from xhs_utils import json_util
+
+# 各接口缓存时间(秒), 没有列出的接口不缓存
+DEFAULT_TTLS = {
+    'get_homefeed_all_channel': 3600,
+    'get_note_info': 600,
+    'get_user_info': 600,
+    'get_search_keyword': 300,
+}
+
+
+class MemoryCache():
+    """
+        进程内的 LRU 缓存, 线程安全
+        :param maxsize: 最多缓存的条数, 超出时淘汰最久没访问的
+    """
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SqliteCache():
+    """
+        本地 sqlite 文件缓存, 重启后仍然有效, 接口和 MemoryCache 一致
+        :param path: 数据库文件路径
+        :param maxsize: 最多缓存的条数, 超出时淘汰最久没访问的, 每写入 100 次检查一次
+    """
+    def __init__(self, path, maxsize=100000):
+        self.path = path
+        self.maxsize = maxsize
+        dir_path = os.path.dirname(os.path.abspath(path))
+        if not os.path.exists(dir_path):
+            os.makedirs(dir_path)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT, expires REAL, accessed REAL)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)')
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute('SELECT value, expires FROM cache WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            value, expires = row
+            if expires <= now:
+                self._conn.execute('DELETE FROM cache WHERE key = ?', (key,))
+                return None
+            self._conn.execute('UPDATE cache SET accessed = ? WHERE key = ?', (now, key))
+            return value
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)', (key, value, now + ttl, now))
+            # 统计条数要扫表, 每写入 100 次才检查一次容量
+            self._writes += 1
+            if self._writes % 100 == 0:
+                self._prune(now)
+
+    def _prune(self, now):
+        self._conn.execute('DELETE FROM cache WHERE expires <= ?', (now,))
+        excess = self._conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0] - self.maxsize
+        if excess > 0:
+            self._conn.execute('DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed LIMIT ?)', (excess,))
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM cache')
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ResponseCache():
+    """
+        接口响应缓存, 只缓存成功的响应, 按接口设置缓存时间, 统计每个接口的命中数
+        缓存的 key 不包含 cookies, 不同账号请求同一条数据共用缓存
+        值以 json 字符串保存, 每次命中返回新的对象, 调用方修改返回值不会污染缓存
+        :param backend: MemoryCache 或 SqliteCache, 默认 MemoryCache()
+        :param ttls: 各接口的缓存时间(秒), 默认 DEFAULT_TTLS
+    """
+    def __init__(self, backend=None, ttls: dict = None):
+        self.backend = backend if backend is not None else MemoryCache()
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.hits = defaultdict(int)
+        self.misses = defaultdict(int)
+
+    @classmethod
+    def from_env(cls):
+        """
+            XHS_CACHE=off 时不缓存, 设置 XHS_CACHE_PATH 时使用 sqlite 文件缓存, 否则使用内存缓存
+        """
+        if os.getenv('XHS_CACHE', '').lower() == 'off':
+            return None
+        path = os.getenv('XHS_CACHE_PATH')
+        return cls(SqliteCache(path) if path else MemoryCache())
+
+    @staticmethod
+    def make_key(endpoint, key):
+        return f'{endpoint}:{key}'
+
+    def get(self, endpoint: str, key: str):
+        """
+            返回缓存的响应, 没有缓存或已过期时返回 None
+        """
+        if endpoint not in self.ttls:
+            return None
+        value = self.backend.get(self.make_key(endpoint, key))
+        if value is None:
+            self.misses[endpoint] += 1
+            return None
+        self.hits[endpoint] += 1
+        return json_util.loads(value)
+
+    def set(self, endpoint: str, key: str, res_json: dict):
+        ttl = self.ttls.get(endpoint)
+        if not ttl or not res_json.get('success'):
+            return
+        self.backend.set(self.make_key(endpoint, key), json_util.dumps(res_json), ttl)
+
+    def invalidate(self, endpoint: str, key: str):
+        self.backend.delete(self.make_key(endpoint, key))
+
+    def stats(self):
+        """
+            返回每个接口的命中数和未命中数
+        """
+        return {endpoint: {'hits': self.hits[endpoint], 'misses': self.misses[endpoint]} for endpoint in self.ttls}
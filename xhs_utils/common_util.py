@@ -1,10 +1,12 @@
 import os
 from loguru import logger
 from dotenv import load_dotenv
+from xhs_utils.cookie_pool import load_cookies
 
 def load_env():
+    # 设置了 XHS_COOKIES_PATH 时返回多账号的 CookiePool, 可以和 cookies 字符串一样传给 XHS_Apis
     load_dotenv()
-    cookies_str = os.getenv('COOKIES')
+    cookies_str = load_cookies(os.getenv('COOKIES'))
     return cookies_str
 
 def init():
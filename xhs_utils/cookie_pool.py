@@ -0,0 +1,170 @@
+import os
+import threading
+import time
+from loguru import logger
+from xhs_utils.cookie_util import trans_cookies
+
+# 接口返回这些 code 说明账号登录失效或者被限制, 需要隔离
+LOGIN_FAILURE_CODES = {
+    -100,    # 登录已过期
+    -101,    # 无登录信息
+    300011,  # 当前账号存在异常
+}
+
+
+class CookiePoolExhausted(Exception):
+    """
+        所有账号都在隔离中
+    """
+
+
+class Account():
+    """
+        账号池里的一个账号和它的调用统计
+    """
+    def __init__(self, cookies_str: str, name: str = ''):
+        self.cookies_str = cookies_str
+        self.a1 = trans_cookies(cookies_str).get('a1', '')
+        self.name = name or self.a1
+        self.calls = 0
+        self.errors = 0
+        self.last_used = 0.0
+        self.quarantined_until = 0.0
+        self.quarantine_reason = ''
+
+    @property
+    def error_rate(self):
+        return self.errors / self.calls if self.calls else 0.0
+
+    def __repr__(self):
+        return f'Account(name={self.name!r}, calls={self.calls}, errors={self.errors})'
+
+
+class CookiePool():
+    """
+        多账号 cookies 池, 可以直接作为 cookies_str 传给 XHS_Apis 的方法, 每个请求从池里挑一个账号
+        :param cookies_list: cookies 字符串列表, 或者 (名字, cookies) 列表
+        :param strategy: lru 选最久没用的账号, least_error 选错误率最低的账号(相同时选最久没用的)
+        :param cooldown: 命中风控或登录失效后的隔离时间(秒), 到期后自动恢复
+    """
+    def __init__(self, cookies_list, strategy='lru', cooldown=600):
+        if strategy not in ('lru', 'least_error'):
+            raise ValueError(f'未知的调度策略 {strategy}')
+        self.strategy = strategy
+        self.cooldown = cooldown
+        self.accounts = {}
+        for item in cookies_list:
+            name, cookies_str = item if isinstance(item, tuple) else ('', item)
+            account = Account(cookies_str, name)
+            self.accounts[cookies_str] = account
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_path(cls, path: str, **kwargs):
+        """
+            从文件或目录加载账号
+            文件: 每行一个 cookies, 空行和 # 开头的行忽略
+            目录: 每个文件一个账号, 文件名作为账号名
+        """
+        cookies_list = []
+        if os.path.isdir(path):
+            for file_name in sorted(os.listdir(path)):
+                file_path = os.path.join(path, file_name)
+                if file_name.startswith('.') or not os.path.isfile(file_path):
+                    continue
+                with open(file_path, encoding='utf-8') as f:
+                    cookies_str = f.read().strip()
+                if cookies_str:
+                    cookies_list.append((os.path.splitext(file_name)[0], cookies_str))
+        else:
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if line and not line.startswith('#'):
+                        cookies_list.append(line)
+        logger.info(f'从 {path} 加载了 {len(cookies_list)} 个账号')
+        return cls(cookies_list, **kwargs)
+
+    def __len__(self):
+        return len(self.accounts)
+
+    def _pick(self, now):
+        healthy = [account for account in self.accounts.values() if account.quarantined_until <= now]
+        if not healthy:
+            return None
+        if self.strategy == 'least_error':
+            return min(healthy, key=lambda account: (account.error_rate, account.last_used))
+        return min(healthy, key=lambda account: account.last_used)
+
+    def acquire(self):
+        """
+            挑一个没有被隔离的账号, 返回它的 cookies 字符串, 都在隔离中时抛 CookiePoolExhausted
+        """
+        with self._lock:
+            now = time.monotonic()
+            account = self._pick(now)
+            if account is None:
+                wait = min(account.quarantined_until for account in self.accounts.values()) - now
+                raise CookiePoolExhausted(f'{len(self.accounts)} 个账号都在隔离中, {wait:.0f} 秒后恢复')
+            if account.quarantine_reason:
+                logger.info(f'账号 {account.name} 隔离结束')
+                account.quarantine_reason = ''
+            account.last_used = now
+            account.calls += 1
+            return account.cookies_str
+
+    def report_error(self, cookies_str: str):
+        """
+            记录一次失败, 影响 least_error 策略的选择
+        """
+        with self._lock:
+            account = self.accounts.get(cookies_str)
+            if account is not None:
+                account.errors += 1
+
+    def quarantine(self, cookies_str: str, reason: str, cooldown: float = None):
+        """
+            隔离账号, 冷却时间内不会被选中
+        """
+        with self._lock:
+            account = self.accounts.get(cookies_str)
+            if account is None:
+                return
+            account.errors += 1
+            account.quarantined_until = time.monotonic() + (self.cooldown if cooldown is None else cooldown)
+            account.quarantine_reason = reason
+        logger.warning(f'账号 {account.name} 被隔离 {self.cooldown if cooldown is None else cooldown} 秒: {reason}')
+
+    def check_response(self, cookies_str: str, res_json: dict):
+        """
+            根据接口返回判断账号状态, 登录失效的账号隔离, 其它失败计入错误
+        """
+        if res_json.get('code') in LOGIN_FAILURE_CODES:
+            self.quarantine(cookies_str, f'{res_json.get("code")} {res_json.get("msg")}')
+        elif not res_json.get('success', True):
+            self.report_error(cookies_str)
+
+    def stats(self):
+        """
+            返回每个账号的调用数, 错误数和隔离状态
+        """
+        with self._lock:
+            now = time.monotonic()
+            return [{
+                'name': account.name,
+                'calls': account.calls,
+                'errors': account.errors,
+                'quarantined': account.quarantined_until > now,
+                'quarantine_reason': account.quarantine_reason,
+            } for account in self.accounts.values()]
+
+
+def load_cookies(default: str = None):
+    """
+        设置了环境变量 XHS_COOKIES_PATH(文件或目录) 时返回 CookiePool, 否则返回单个 cookies 字符串
+        XHS_COOKIES_STRATEGY 和 XHS_COOKIES_COOLDOWN 设置调度策略和隔离时间
+    """
+    path = os.getenv('XHS_COOKIES_PATH')
+    if path:
+        return CookiePool.from_path(path, strategy=os.getenv('XHS_COOKIES_STRATEGY', 'lru'), cooldown=float(os.getenv('XHS_COOKIES_COOLDOWN', 600)))
+    return default
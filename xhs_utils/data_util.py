@@ -1,11 +1,15 @@
-import json
 import os
 import re
 import time
 import openpyxl
-import requests
 from loguru import logger
-from retry import retry
+from xhs_utils import json_util
+from xhs_utils.download_util import Downloader
+
+# 图片和视频cdn(sns-webpic, sns-img-qc, sns-video-bd等)使用独立的连接池, 不占用api的连接
+# 所有笔记共用一个下载器, 全局和每个cdn域名的并发数都有上限
+# 设置环境变量 XHS_DOWNLOAD_SEGMENT_MB 后, 超过两段大小的视频按段并发下载
+media_downloader = Downloader(max_workers=16, segment_size=int(os.getenv('XHS_DOWNLOAD_SEGMENT_MB', 0)) * 1024 * 1024 or None)
 
 
 def norm_str(str):
@@ -132,6 +136,74 @@ def handle_note_info(data):
         'ip_location': ip_location,
     }
 
+# 搜索结果的笔记卡片里有的字段, 只需要这些字段时不用再请求笔记详情
+# 卡片里没有 desc, video_addr, tags, upload_time, ip_location
+SEARCH_ITEM_FIELDS = {'note_id', 'note_url', 'note_type', 'user_id', 'home_url', 'nickname', 'avatar', 'title', 'liked_count', 'collected_count', 'comment_count', 'share_count', 'video_cover', 'image_list'}
+
+def search_item_url(data):
+    """
+        搜索结果里笔记卡片对应的笔记链接
+    """
+    return f"https://www.xiaohongshu.com/explore/{data['id']}?xsec_token={data['xsec_token']}"
+
+def handle_search_item(data):
+    """
+        用搜索结果里的笔记卡片生成和 handle_note_info 字段相同的笔记信息, 不需要再请求笔记详情
+        卡片里没有的字段为 None, 需要时再用 get_note_info 获取
+    """
+    note_id = data['id']
+    note_url = search_item_url(data)
+    note_card = data['note_card']
+    note_type = note_card['type']
+    if note_type == 'normal':
+        note_type = '图集'
+    else:
+        note_type = '视频'
+    user_id = note_card['user']['user_id']
+    home_url = f'https://www.xiaohongshu.com/user/profile/{user_id}'
+    nickname = note_card['user'].get('nickname', note_card['user'].get('nick_name'))
+    avatar = note_card['user']['avatar']
+    title = note_card.get('display_title', '')
+    if title.strip() == '':
+        title = '无标题'
+    interact_info = note_card['interact_info']
+    liked_count = interact_info.get('liked_count')
+    collected_count = interact_info.get('collected_count')
+    comment_count = interact_info.get('comment_count')
+    share_count = interact_info.get('shared_count', interact_info.get('share_count'))
+    image_list = []
+    for image in note_card.get('image_list', []):
+        try:
+            image_list.append(image['info_list'][1]['url'])
+        except:
+            pass
+    if note_type == '视频':
+        # 和 handle_note_info 一样取第一张图片
+        video_cover = image_list[0] if image_list else None
+    else:
+        video_cover = None
+    return {
+        'note_id': note_id,
+        'note_url': note_url,
+        'note_type': note_type,
+        'user_id': user_id,
+        'home_url': home_url,
+        'nickname': nickname,
+        'avatar': avatar,
+        'title': title,
+        'desc': None,
+        'liked_count': liked_count,
+        'collected_count': collected_count,
+        'comment_count': comment_count,
+        'share_count': share_count,
+        'video_cover': video_cover,
+        'video_addr': None,
+        'image_list': image_list,
+        'tags': None,
+        'upload_time': None,
+        'ip_location': None,
+    }
+
 def handle_comment_info(data):
     note_id = data['note_id']
     note_url = data['note_url']
@@ -175,35 +247,42 @@ def handle_comment_info(data):
         'ip_location': ip_location,
         'pictures': pictures,
     }
+XLSX_HEADERS = {
+    'note': ['笔记id', '笔记url', '笔记类型', '用户id', '用户主页url', '昵称', '头像url', '标题', '描述', '点赞数量', '收藏数量', '评论数量', '分享数量', '视频封面url', '视频地址url', '图片地址url列表', '标签', '上传时间', 'ip归属地'],
+    'user': ['用户id', '用户主页url', '用户名', '头像url', '小红书号', '性别', 'ip地址', '介绍', '关注数量', '粉丝数量', '作品被赞和收藏数量', '标签'],
+    'comment': ['笔记id', '笔记url', '评论id', '用户id', '用户主页url', '昵称', '头像url', '评论内容', '评论标签', '点赞数量', '上传时间', 'ip归属地', '图片地址url列表'],
+}
+
+class XlsxWriter():
+    """
+        逐行写入excel, 行数据写到临时文件里不留在内存, close 时保存到 file_path
+        :param type: note, user 或 comment, 决定表头
+    """
+    def __init__(self, file_path, type='note'):
+        self.file_path = file_path
+        self.wb = openpyxl.Workbook(write_only=True)
+        self.ws = self.wb.create_sheet()
+        self.ws.append(XLSX_HEADERS.get(type, XLSX_HEADERS['comment']))
+
+    def append(self, data):
+        self.ws.append([norm_text(str(v)) for v in data.values()])
+
+    def close(self):
+        self.wb.save(self.file_path)
+        logger.info(f'数据保存至 {self.file_path}')
+
 def save_to_xlsx(datas, file_path, type='note'):
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    if type == 'note':
-        headers = ['笔记id', '笔记url', '笔记类型', '用户id', '用户主页url', '昵称', '头像url', '标题', '描述', '点赞数量', '收藏数量', '评论数量', '分享数量', '视频封面url', '视频地址url', '图片地址url列表', '标签', '上传时间', 'ip归属地']
-    elif type == 'user':
-        headers = ['用户id', '用户主页url', '用户名', '头像url', '小红书号', '性别', 'ip地址', '介绍', '关注数量', '粉丝数量', '作品被赞和收藏数量', '标签']
-    else:
-        headers = ['笔记id', '笔记url', '评论id', '用户id', '用户主页url', '昵称', '头像url', '评论内容', '评论标签', '点赞数量', '上传时间', 'ip归属地', '图片地址url列表']
-    ws.append(headers)
+    writer = XlsxWriter(file_path, type)
     for data in datas:
-        data = {k: norm_text(str(v)) for k, v in data.items()}
-        ws.append(list(data.values()))
-    wb.save(file_path)
-    logger.info(f'数据保存至 {file_path}')
+        writer.append(data)
+    writer.close()
 
 def download_media(path, name, url, type):
-    if type == 'image':
-        content = requests.get(url).content
-        with open(path + '/' + name + '.jpg', mode="wb") as f:
-            f.write(content)
-    elif type == 'video':
-        res = requests.get(url, stream=True)
-        size = 0
-        chunk_size = 1024 * 1024
-        with open(path + '/' + name + '.mp4', mode="wb") as f:
-            for data in res.iter_content(chunk_size=chunk_size):
-                f.write(data)
-                size += len(data)
+    """
+        下载一个图片或视频, 返回下载结果, 见 Downloader.fetch
+    """
+    ext = 'mp4' if type == 'video' else 'jpg'
+    return media_downloader.fetch(url, f'{path}/{name}.{ext}', type)
 
 def save_user_detail(user, path):
     with open(f'{path}/detail.txt', mode="w", encoding="utf-8") as f:
@@ -246,8 +325,11 @@ def save_note_detail(note, path):
 
 
 
-@retry(tries=3, delay=1)
 def download_note(note_info, path, save_choice):
+    """
+        保存笔记信息并下载笔记的图片和视频, 图片并发下载, 每个文件单独重试
+        返回 (保存路径, 每个文件的下载结果列表)
+    """
     note_id = note_info['note_id']
     user_id = note_info['user_id']
     title = note_info['title']
@@ -259,16 +341,18 @@ def download_note(note_info, path, save_choice):
     save_path = f'{path}/{nickname}_{user_id}/{title}_{note_id}'
     check_and_create_path(save_path)
     with open(f'{save_path}/info.json', mode='w', encoding='utf-8') as f:
-        f.write(json.dumps(note_info) + '\n')
+        f.write(json_util.dumps(note_info) + '\n')
     note_type = note_info['note_type']
     save_note_detail(note_info, save_path)
+    tasks = []
     if note_type == '图集' and save_choice in ['media', 'media-image', 'all']:
         for img_index, img_url in enumerate(note_info['image_list']):
-            download_media(save_path, f'image_{img_index}', img_url, 'image')
+            tasks.append((img_url, f'{save_path}/image_{img_index}.jpg', 'image'))
     elif note_type == '视频' and save_choice in ['media', 'media-video', 'all']:
-        download_media(save_path, 'cover', note_info['video_cover'], 'image')
-        download_media(save_path, 'video', note_info['video_addr'], 'video')
-    return save_path
+        tasks.append((note_info['video_cover'], f'{save_path}/cover.jpg', 'image'))
+        tasks.append((note_info['video_addr'], f'{save_path}/video.mp4', 'video'))
+    results = media_downloader.download(tasks)
+    return save_path, results
 
 
 def check_and_create_path(path):
@@ -0,0 +1,217 @@
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from loguru import logger
+from xhs_utils.http_util import HttpTransport
+from xhs_utils.request_util import RetryPolicy
+
+# 各cdn域名(按前缀匹配)同时下载的文件数上限, 视频文件大, 并发少一些
+HOST_LIMITS = {
+    'sns-webpic': 8,
+    'sns-img-qc': 8,
+    'sns-video-bd': 4,
+}
+
+
+class Downloader():
+    """
+        共享的媒体文件下载器, 线程池并发下载, 全局和每个cdn域名分别限制并发数, 复用同一个连接池
+        每个文件单独重试, 一个文件失败不影响其它文件
+        视频先写入 .part 文件, 中断后用 Range 从断点接着下载, 大小和 Content-Length 一致后才改名为正式文件
+        :param max_workers: 全局同时下载的文件数
+        :param host_limits: 按域名前缀限制的并发数, 默认 HOST_LIMITS
+        :param default_host_limit: 没有列出的域名的并发数
+        :param transport: HttpTransport, 默认新建一个连接数和 max_workers 一致的连接池
+        :param retry_policy: 超时和重试策略, 默认连接超时5秒, 两次读取之间最多等30秒, 失败重试2次
+        :param segment_size: 视频超过两段大小时按这个大小(字节)分段并发下载, 每段单独续传, 默认不分段
+        :param segments: 一个视频同时下载的段数, 每一段都占用一个域名并发名额
+    """
+    def __init__(self, max_workers=16, host_limits: dict = None, default_host_limit=4, transport: HttpTransport = None, retry_policy: RetryPolicy = None, segment_size: int = None, segments=4):
+        self.max_workers = max_workers
+        self.host_limits = dict(HOST_LIMITS if host_limits is None else host_limits)
+        self.default_host_limit = default_host_limit
+        self.transport = transport or HttpTransport(pool_connections=8, pool_maxsize=max_workers)
+        self.retry_policy = retry_policy or RetryPolicy(timeout=(5, 30), retries=2)
+        self.segment_size = segment_size
+        self.segments = segments
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='xhs_download')
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def _host_semaphore(self, url):
+        host = urlparse(url).hostname or ''
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                limit = next((limit for prefix, limit in self.host_limits.items() if host.startswith(prefix)), self.default_host_limit)
+                semaphore = self._semaphores[host] = threading.BoundedSemaphore(limit)
+        return semaphore
+
+    def _save(self, url, file_path, type):
+        if type == 'video':
+            return self._save_video(url, file_path)
+        with self._host_semaphore(url):
+            response = self.transport.get(url, timeout=self.retry_policy.timeout)
+            response.raise_for_status()
+        with open(file_path, mode='wb') as f:
+            f.write(response.content)
+        return len(response.content)
+
+    def _save_video(self, url, file_path):
+        part_path = f'{file_path}.part'
+        if self.segment_size and not os.path.exists(part_path):
+            total = self._probe(url)
+            if total is not None and total >= 2 * self.segment_size:
+                self._save_segments(url, part_path, total)
+                return self._finish(part_path, file_path, total)
+        expected = self._download_range(url, part_path)
+        return self._finish(part_path, file_path, expected)
+
+    def _probe(self, url):
+        """
+            请求第一个字节获取文件大小, 服务端不支持 Range 时返回 None
+        """
+        with self._host_semaphore(url):
+            response = self.transport.get(url, headers={'Range': 'bytes=0-0'}, stream=True, timeout=self.retry_policy.timeout)
+            response.close()
+        total = response.headers.get('Content-Range', '').rpartition('/')[2]
+        if response.status_code != 206 or not total.isdigit():
+            return None
+        return int(total)
+
+    @staticmethod
+    def _validator(response):
+        return response.headers.get('ETag') or response.headers.get('Last-Modified')
+
+    @staticmethod
+    def _remove(*paths):
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _download_range(self, url, path, start=0, end=None):
+        """
+            把 url 从 start 到 end(包含)的字节下载到 path, path 里已有的部分不再下载
+            开始下载时把 ETag/Last-Modified 记到 path.meta, 续传时带 If-Range, 文件变了服务端返回整个文件, 从头下载
+            返回 path 下载完整时的字节数, 服务端没有返回文件大小时为 None
+            每个连接占用一个域名并发名额
+        """
+        meta_path = f'{path}.meta'
+        done = os.path.getsize(path) if os.path.exists(path) else 0
+        validator = None
+        if done:
+            if os.path.exists(meta_path):
+                with open(meta_path, encoding='utf-8') as f:
+                    validator = f.read().strip() or None
+            if validator is None:
+                # 不知道已下载的部分是不是同一个文件, 不续传
+                done = 0
+        if end is not None and done >= end - start + 1:
+            return end - start + 1
+        headers = {}
+        if start + done > 0 or end is not None:
+            headers['Range'] = f'bytes={start + done}-{"" if end is None else end}'
+        if done:
+            headers['If-Range'] = validator
+        with self._host_semaphore(url):
+            response = self.transport.get(url, headers=headers, stream=True, timeout=self.retry_policy.timeout)
+            try:
+                content_range = response.headers.get('Content-Range', '')
+                total = content_range.rpartition('/')[2]
+                if response.status_code == 416 and end is None and done:
+                    # 上次已经下载完整, 只是没来得及改名
+                    if total.isdigit() and int(total) == done:
+                        return done
+                    self._remove(path, meta_path)
+                    raise Exception(f'续传位置无效: {content_range}')
+                response.raise_for_status()
+                if response.status_code == 206:
+                    if not content_range.startswith(f'bytes {start + done}-'):
+                        self._remove(path, meta_path)
+                        raise Exception(f'服务端返回的范围不对: {content_range}')
+                    expected = end - start + 1 if end is not None else (int(total) if total.isdigit() else None)
+                else:
+                    if start or end is not None:
+                        # 分段下载时文件变了或服务端不支持 Range, 删掉这一段, 重试时整个重新分段
+                        self._remove(path, meta_path)
+                        raise Exception(f'服务端不支持 Range 或文件已变化: {response.status_code}')
+                    # 服务端忽略了 Range 或者文件变了, 返回的是整个文件, 从头写
+                    done = 0
+                    length = response.headers.get('Content-Length')
+                    expected = int(length) if length is not None else None
+                if not done:
+                    with open(meta_path, mode='w', encoding='utf-8') as f:
+                        f.write(self._validator(response) or '')
+                with open(path, mode='ab' if done else 'wb') as f:
+                    for data in response.iter_content(chunk_size=1024 * 1024):
+                        f.write(data)
+            finally:
+                response.close()
+        return expected
+
+    def _save_segments(self, url, part_path, total):
+        ranges = [(start, min(start + self.segment_size, total) - 1) for start in range(0, total, self.segment_size)]
+        paths = [f'{part_path}{index}' for index in range(len(ranges))]
+        with ThreadPoolExecutor(max_workers=self.segments) as executor:
+            futures = [executor.submit(self._download_range, url, path, start, end) for path, (start, end) in zip(paths, ranges)]
+            for future in futures:
+                future.result()
+        try:
+            for path, (start, end) in zip(paths, ranges):
+                if os.path.getsize(path) != end - start + 1:
+                    raise Exception(f'分段 {path} 不完整')
+            with open(part_path, mode='wb') as f:
+                for path in paths:
+                    with open(path, mode='rb') as segment:
+                        shutil.copyfileobj(segment, f, 1024 * 1024)
+        except Exception:
+            # 所有分段都下载完了还是失败, 清理掉, 重试时重新下载
+            self._remove(part_path, *paths)
+            raise
+        finally:
+            self._remove(*[f'{path}.meta' for path in paths])
+        self._remove(*paths)
+
+    def _finish(self, part_path, file_path, expected):
+        """
+            检查 .part 文件大小, 完整时改名为正式文件; 不完整时保留 .part, 下次接着下载
+        """
+        size = os.path.getsize(part_path)
+        if expected is not None and size != expected:
+            if size > expected:
+                # 比预期还大说明数据错乱, 删掉从头下载
+                self._remove(part_path, f'{part_path}.meta')
+            raise Exception(f'下载不完整 {size}/{expected}')
+        os.replace(part_path, file_path)
+        self._remove(f'{part_path}.meta')
+        return size
+
+    def fetch(self, url: str, file_path: str, type='image'):
+        """
+            下载一个文件, 失败时按退避重试, 视频重试时从断点接着下载
+            :param type: image 一次读完, video 分块写入 .part 文件, 完整后改名
+            返回 {'url': 地址, 'path': 保存路径, 'success': 是否成功, 'msg': 失败原因, 'size': 字节数}
+        """
+        attempt = 0
+        while True:
+            try:
+                size = self._save(url, file_path, type)
+                return {'url': url, 'path': file_path, 'success': True, 'msg': 'success', 'size': size}
+            except Exception as e:
+                if attempt >= self.retry_policy.retries:
+                    logger.warning(f'下载 {url} 失败: {e}')
+                    return {'url': url, 'path': file_path, 'success': False, 'msg': str(e), 'size': 0}
+                time.sleep(self.retry_policy.delay(attempt))
+                attempt += 1
+
+    def download(self, tasks: list):
+        """
+            并发下载一组文件
+            :param tasks: [(url, 保存路径, type)]
+            返回每个文件的 fetch 结果, 顺序和 tasks 一致
+        """
+        futures = [self._executor.submit(self.fetch, *task) for task in tasks]
+        return [future.result() for future in futures]
@@ -0,0 +1,165 @@
+import json
+import threading
+from collections import Counter
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from requests.cookies import RequestsCookieJar
+
+
+class NoStoreCookiePolicy(DefaultCookiePolicy):
+    # 连接池被多个账号共用, 不保存响应里的 set-cookie, cookies 只按请求传入
+    def set_ok(self, cookie, request):
+        return False
+
+
+def httpx_timeout(timeout):
+    """
+        requests 风格的 (连接超时, 读取超时) 转成 httpx.Timeout
+    """
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+        return httpx.Timeout(read, connect=connect)
+    return timeout
+
+
+class HttpTransport():
+    """
+        带连接池的http传输层, 每组代理对应一个 requests.Session
+        同一个 Session 内按host复用 keep-alive 连接, 只有新建连接时才需要tcp和tls握手
+        :param pool_connections: 每个 Session 缓存的host连接池数量
+        :param pool_maxsize: 每个host连接池保持的最大连接数, 按并发线程数设置
+        :param pool_block: 连接池用满时是否等待空闲连接, 否则临时新建连接
+    """
+    def __init__(self, pool_connections=10, pool_maxsize=20, pool_block=False):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self.protocols = Counter()
+
+    @staticmethod
+    def _proxy_key(proxies):
+        if not proxies:
+            return ''
+        return json.dumps(proxies, sort_keys=True)
+
+    def _new_session(self, proxies):
+        session = requests.Session()
+        session.cookies = RequestsCookieJar(policy=NoStoreCookiePolicy())
+        if proxies:
+            session.proxies.update(proxies)
+        adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize, pool_block=self.pool_block)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def session(self, proxies: dict = None):
+        key = self._proxy_key(proxies)
+        session = self._sessions.get(key)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(key)
+                if session is None:
+                    session = self._sessions[key] = self._new_session(proxies)
+        return session
+
+    def request(self, method, url, proxies: dict = None, **kwargs):
+        response = self.session(proxies).request(method, url, **kwargs)
+        with self._lock:
+            self.protocols['HTTP/1.0' if response.raw.version == 10 else 'HTTP/1.1'] += 1
+        return response
+
+    def get(self, url, proxies: dict = None, **kwargs):
+        return self.request('GET', url, proxies, **kwargs)
+
+    def post(self, url, proxies: dict = None, **kwargs):
+        return self.request('POST', url, proxies, **kwargs)
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+    def stats(self):
+        """
+            返回连接池数量和各协议版本的响应数
+        """
+        return {'sessions': len(self._sessions), 'protocols': dict(self.protocols)}
+
+
+class Http2Transport():
+    """
+        基于 httpx.Client 的 HTTP/2 传输层, 接口与 HttpTransport 一致, 需要安装 httpx[http2]
+        api 请求都发往同一个host, 每组代理只需要一条多路复用的连接, 并发请求作为不同的 stream 共用这条连接
+        服务端或代理不支持 HTTP/2 时自动回退到 HTTP/1.1, 实际协商的协议见 stats()
+        :param max_connections: 每组代理的最大连接数, HTTP/2 下一条连接可以承载多个并发请求
+        :param max_keepalive_connections: 保持的空闲连接数
+        :param keepalive_expiry: 空闲连接保持时间(秒)
+    """
+    def __init__(self, max_connections=10, max_keepalive_connections=10, keepalive_expiry=30.0):
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive_connections, keepalive_expiry=keepalive_expiry)
+        self._clients = {}
+        self._lock = threading.Lock()
+        self.protocols = Counter()
+
+    _proxy_key = staticmethod(HttpTransport._proxy_key)
+
+    def _new_client(self, proxies):
+        mounts = None
+        if proxies:
+            mounts = {f'{scheme}://': httpx.HTTPTransport(proxy=proxy, http2=True, limits=self.limits) for scheme, proxy in proxies.items() if proxy}
+        return httpx.Client(
+            http2=True,
+            limits=self.limits,
+            mounts=mounts,
+            cookies=httpx.Cookies(CookieJar(policy=NoStoreCookiePolicy())),
+            timeout=None,
+        )
+
+    def client(self, proxies: dict = None):
+        key = self._proxy_key(proxies)
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = self._clients[key] = self._new_client(proxies)
+        return client
+
+    def request(self, method, url, proxies: dict = None, data=None, cookies: dict = None, headers: dict = None, **kwargs):
+        # 兼容 requests 风格的参数: 字符串 data 作为请求体, cookies 拼进请求头, 不写入共享的 client
+        if isinstance(data, (str, bytes)):
+            kwargs['content'] = data.encode('utf-8') if isinstance(data, str) else data
+        elif data is not None:
+            kwargs['data'] = data
+        if cookies:
+            headers = dict(headers or {})
+            headers['cookie'] = '; '.join(f'{k}={v}' for k, v in cookies.items())
+        if 'timeout' in kwargs:
+            kwargs['timeout'] = httpx_timeout(kwargs['timeout'])
+        response = self.client(proxies).request(method, url, headers=headers, **kwargs)
+        with self._lock:
+            self.protocols[response.http_version] += 1
+        return response
+
+    def get(self, url, proxies: dict = None, **kwargs):
+        return self.request('GET', url, proxies, **kwargs)
+
+    def post(self, url, proxies: dict = None, **kwargs):
+        return self.request('POST', url, proxies, **kwargs)
+
+    def close(self):
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients.clear()
+
+    def stats(self):
+        """
+            返回连接池数量和各协议版本的响应数
+        """
+        return {'sessions': len(self._clients), 'protocols': dict(self.protocols)}
@@ -0,0 +1,106 @@
+import queue
+import threading
+from loguru import logger
+
+_DONE = object()
+# 失败或被丢弃的数据在后续阶段里的占位, 按顺序处理的阶段靠它知道这个位置不会再来
+_SKIP = object()
+
+
+class Pipeline():
+    """
+        多阶段流水线, 各阶段同时进行, 阶段之间用有界队列连接, 下游处理不过来时上游阻塞等待(背压)
+        用法: Pipeline(maxsize=100).add('detail', fetch, workers=4).add('media', download, workers=2).add('sink', save, ordered=True).run(urls)
+        :param maxsize: 每个阶段输入队列的长度
+    """
+    def __init__(self, maxsize: int = 100):
+        self.maxsize = maxsize
+        self.stages = []
+        self.failed = []
+        self._lock = threading.Lock()
+
+    def add(self, name: str, fn, workers: int = 1, ordered: bool = False):
+        """
+            添加一个阶段
+            :param name: 阶段名, 出现在失败记录里
+            :param fn: fn(item) 返回交给下一阶段的数据, 返回 None 时丢弃, 抛出异常时记入 failed
+            :param workers: 这个阶段的线程数
+            :param ordered: 按 source 的顺序处理, 只用一个线程, 先到的数据缓存到前面的数据处理完, 适合写文件等输出阶段
+        """
+        self.stages.append((name, fn, 1 if ordered else workers, ordered))
+        return self
+
+    def _fail(self, stage, item, error):
+        logger.warning(f'流水线阶段 {stage} 处理 {item} 失败: {error}')
+        with self._lock:
+            self.failed.append({'stage': stage, 'item': item, 'msg': str(error)})
+
+    def _feed(self, source, out, consumers):
+        try:
+            for index, item in enumerate(source):
+                out.put((index, item, item))
+        except Exception as e:
+            # 数据源出错时停止投递, 已经投递的数据继续处理完
+            self._fail('source', None, e)
+        finally:
+            for _ in range(consumers):
+                out.put(_DONE)
+
+    def _process(self, name, fn, task, out):
+        index, origin, item = task
+        if item is not _SKIP:
+            try:
+                item = fn(item)
+            except Exception as e:
+                self._fail(name, origin, e)
+                item = None
+            if item is None:
+                item = _SKIP
+        out.put((index, origin, item))
+
+    def _work(self, name, fn, ordered, inp, out, remaining, consumers):
+        pending, next_index = {}, 0
+        while True:
+            task = inp.get()
+            if task is _DONE:
+                break
+            if not ordered:
+                self._process(name, fn, task, out)
+                continue
+            pending[task[0]] = task
+            while next_index in pending:
+                self._process(name, fn, pending.pop(next_index), out)
+                next_index += 1
+        with self._lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        # 这一阶段的最后一个线程结束时, 给下一阶段的每个线程发结束标记
+        if last:
+            for _ in range(consumers):
+                out.put(_DONE)
+
+    def run(self, source):
+        """
+            把 source 里的数据逐个送入第一个阶段, 等所有阶段处理完
+            返回最后一个阶段的输出, 按 source 的顺序排列; 失败的数据见 self.failed, item 为 source 里的原始数据
+        """
+        queues = [queue.Queue(self.maxsize) for _ in range(len(self.stages) + 1)]
+        consumers = [workers for _, _, workers, _ in self.stages] + [1]
+        threads = [threading.Thread(target=self._feed, args=(source, queues[0], consumers[0]), daemon=True)]
+        for i, (name, fn, workers, ordered) in enumerate(self.stages):
+            remaining = [workers]
+            for _ in range(workers):
+                threads.append(threading.Thread(target=self._work, args=(name, fn, ordered, queues[i], queues[i + 1], remaining, consumers[i + 1]), daemon=True))
+        for thread in threads:
+            thread.start()
+        results = []
+        while True:
+            task = queues[-1].get()
+            if task is _DONE:
+                break
+            if task[2] is not _SKIP:
+                results.append(task)
+        for thread in threads:
+            thread.join()
+        results.sort(key=lambda task: task[0])
+        return [result for _, _, result in results]
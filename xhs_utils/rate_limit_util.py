@@ -0,0 +1,152 @@
+import asyncio
+import os
+import threading
+import time
+from xhs_utils.budget_util import deadline_allows, deadline_exceeded
+
+# 按接口路径划分的接口族, 按顺序匹配, 都不匹配的归到 other
+ENDPOINT_FAMILIES = (
+    ('comment', ('/comment/',)),
+    ('search', ('/search/',)),
+    ('feed', ('/homefeed', '/v1/feed')),
+    ('user', ('/user/', '/user_posted', '/note/like/', '/note/collect/')),
+    ('message', ('/you/', '/unread_count')),
+)
+
+
+def endpoint_family(api: str):
+    """
+        返回接口所属的接口族 feed/search/comment/user/message/other
+    """
+    path = api.split('?', 1)[0]
+    for family, patterns in ENDPOINT_FAMILIES:
+        if any(pattern in path for pattern in patterns):
+            return family
+    return 'other'
+
+
+class TokenBucket():
+    """
+        令牌桶, 线程安全
+        :param rate: 每秒补充的令牌数, 即长期平均的每秒请求数
+        :param burst: 桶容量, 允许的突发请求数
+    """
+    def __init__(self, rate: float, burst: float = 1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens=1):
+        """
+            预定令牌, 返回需要等待的秒数
+            令牌不够时先记账(余额为负), 等待时间按先来后到排队, 不需要在锁里等待
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= tokens
+            if self.tokens >= 0:
+                return 0
+            return -self.tokens / self.rate
+
+    def cancel(self, tokens=1):
+        """
+            退回 reserve 预定的令牌
+        """
+        with self._lock:
+            self.tokens = min(self.burst, self.tokens + tokens)
+
+    def acquire(self, tokens=1):
+        wait = _check_deadline(self.reserve(tokens), [self], tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def async_acquire(self, tokens=1):
+        wait = _check_deadline(self.reserve(tokens), [self], tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+def _check_deadline(wait, buckets, tokens=1):
+    """
+        在 Budget 的 with 块里, 截止时间前等不到令牌时退回预定的令牌并抛 DeadlineExceeded
+    """
+    if wait > 0 and not deadline_allows(wait):
+        for bucket in buckets:
+            bucket.cancel(tokens)
+        raise deadline_exceeded(f'限速需要等待 {wait:.2f} 秒, 超过时间预算')
+    return wait
+
+
+class RateLimiter():
+    """
+        按账号(a1)限速的请求调度器, 每个账号一个令牌桶, 还可以给每个账号的每个接口族单独设置令牌桶
+        :param rate: 每个账号每秒的请求数, 为空时不限速
+        :param burst: 每个账号允许的突发请求数
+        :param family_rates: 接口族限速 {'search': (rate, burst), 'comment': (rate, burst)}, 同一账号的同一接口族共用一个桶
+    """
+    def __init__(self, rate: float = None, burst: float = 1, family_rates: dict = None):
+        self.rate = rate
+        self.burst = burst
+        self.family_rates = family_rates or {}
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """
+            从环境变量 XHS_RATE_LIMIT(每个账号每秒请求数) 和 XHS_RATE_BURST 创建, 没有设置时不限速
+        """
+        rate = os.getenv('XHS_RATE_LIMIT')
+        return cls(float(rate) if rate else None, float(os.getenv('XHS_RATE_BURST', 1)))
+
+    def _bucket(self, key, rate, burst):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    bucket = self._buckets[key] = TokenBucket(rate, burst)
+        return bucket
+
+    def buckets(self, account: str, api: str):
+        """
+            返回这次请求要经过的令牌桶
+        """
+        buckets = []
+        if self.rate:
+            buckets.append(self._bucket(account, self.rate, self.burst))
+        family = endpoint_family(api)
+        if family in self.family_rates:
+            rate, burst = self.family_rates[family]
+            buckets.append(self._bucket((account, family), rate, burst))
+        return buckets
+
+    def reserve(self, account: str, api: str):
+        # 同时向账号桶和接口族桶预定, 等待时间取最长的那个; 超过截止时间时退回所有桶的令牌, 不占用其它请求的配额
+        buckets = self.buckets(account, api)
+        return _check_deadline(max([bucket.reserve() for bucket in buckets], default=0), buckets)
+
+    def acquire(self, account: str, api: str):
+        """
+            阻塞直到账号可以发出这个接口的请求, 返回等待的秒数
+            在 Budget 的 with 块里, 截止时间前等不到令牌时不等待, 直接抛 DeadlineExceeded
+        """
+        wait = self.reserve(account, api)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def async_acquire(self, account: str, api: str):
+        """
+            acquire 的异步版本
+        """
+        wait = self.reserve(account, api)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
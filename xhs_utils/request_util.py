@@ -0,0 +1,130 @@
+import asyncio
+import random
+import time
+import httpx
+import requests
+from loguru import logger
+from xhs_utils.budget_util import clamp_timeout, deadline_allows
+
+# 风控状态码, 重试只会加重风控, 直接报错交给上层换号/换代理
+RISK_STATUS = {
+    461: '风控拦截(pull block)',
+    462: '设备指纹异常(fingerprint)',
+    465: '风控登录验证(risk login)',
+    471: '疑似垃圾请求(spam)',
+}
+
+# 可以重试的网络错误, 连接失败/超时/连接中途断开
+NETWORK_ERRORS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+    httpx.TransportError,
+)
+
+
+class XhsRiskError(Exception):
+    """
+        命中风控状态码 461/462/465/471
+    """
+    def __init__(self, status_code, url=''):
+        self.status_code = status_code
+        self.url = url
+        super().__init__(f'{status_code} {RISK_STATUS[status_code]}: {url}')
+
+
+class XhsServerError(Exception):
+    """
+        5xx/429 重试用尽
+    """
+    def __init__(self, status_code, url=''):
+        self.status_code = status_code
+        self.url = url
+        super().__init__(f'{status_code} 服务端错误: {url}')
+
+
+class RetryPolicy():
+    """
+        请求超时和重试策略
+        :param timeout: (连接超时, 读取超时) 秒, 代理卡住时不会一直挂起
+        :param retries: 网络错误和 5xx/429 的最大重试次数, 风控状态码不重试
+        :param backoff: 第一次重试的退避上限(秒), 之后每次翻倍
+        :param max_backoff: 退避上限(秒)
+    """
+    def __init__(self, timeout=(5, 15), retries=3, backoff=0.5, max_backoff=8.0):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def delay(self, attempt):
+        # full jitter: 在 [0, backoff * 2^attempt] 里随机, 避免并发请求同时重试
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+    @staticmethod
+    def check(response):
+        """
+            检查响应状态码, 风控直接抛 XhsRiskError, 需要重试返回 True
+        """
+        status_code = response.status_code
+        if status_code in RISK_STATUS:
+            raise XhsRiskError(status_code, str(response.url))
+        return status_code == 429 or status_code >= 500
+
+
+default_policy = RetryPolicy()
+
+
+def execute(send, policy: RetryPolicy = None, acquire=None):
+    """
+        执行请求, 网络错误和 5xx/429 按指数退避重试
+        在 Budget 的 with 块里执行时, 超时收紧到截止时间之前, 来不及重试时直接抛出最后一次的错误
+        :param send: send(attempt, timeout) 发出一次请求并返回响应, 每次重试都会重新调用(可以重新签名)
+        :param policy: RetryPolicy, 为空时使用默认策略
+        :param acquire: 每次发送前调用, 例如等待限速令牌, 超时在它返回之后按剩余时间计算
+        返回响应, 命中风控抛 XhsRiskError, 重试用尽抛 XhsServerError 或最后一次的网络错误, 超过截止时间抛 DeadlineExceeded
+    """
+    policy = policy or default_policy
+    attempt = 0
+    while True:
+        if acquire is not None:
+            acquire()
+        try:
+            response = send(attempt, clamp_timeout(policy.timeout))
+        except NETWORK_ERRORS as e:
+            error = e
+        else:
+            if not policy.check(response):
+                return response
+            error = XhsServerError(response.status_code, str(response.url))
+        delay = policy.delay(attempt)
+        if attempt >= policy.retries or not deadline_allows(delay):
+            raise error
+        logger.warning(f'请求失败 {error}, 第{attempt + 1}次重试')
+        time.sleep(delay)
+        attempt += 1
+
+
+async def async_execute(send, policy: RetryPolicy = None, acquire=None):
+    """
+        execute 的异步版本, send(attempt, timeout) 和 acquire() 返回 awaitable
+    """
+    policy = policy or default_policy
+    attempt = 0
+    while True:
+        if acquire is not None:
+            await acquire()
+        try:
+            response = await send(attempt, clamp_timeout(policy.timeout))
+        except NETWORK_ERRORS as e:
+            error = e
+        else:
+            if not policy.check(response):
+                return response
+            error = XhsServerError(response.status_code, str(response.url))
+        delay = policy.delay(attempt)
+        if attempt >= policy.retries or not deadline_allows(delay):
+            raise error
+        logger.warning(f'请求失败 {error}, 第{attempt + 1}次重试')
+        await asyncio.sleep(delay)
+        attempt += 1
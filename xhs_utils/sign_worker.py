@@ -0,0 +1,238 @@
+import itertools
+import os
+import queue
+import subprocess
+import threading
+import time
+from loguru import logger
+from xhs_utils import json_util
+
+STATIC_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '../static'))
+WORKER_SCRIPT = os.path.join(STATIC_PATH, 'xhs_sign_worker.js')
+
+
+class SignWorkerError(Exception):
+    pass
+
+
+class SignWorker():
+    """
+        常驻的 node 签名进程, 通过 stdin/stdout 按行收发 json
+        第一次调用时才启动进程, 进程崩溃或超时后自动重启
+        :param module_path: 签名js文件路径, 需要通过 module.exports 导出签名函数
+        :param node: node 可执行文件
+        :param timeout: 单次调用的超时时间(秒)
+    """
+    def __init__(self, module_path, node='node', timeout=10):
+        self.module_path = module_path
+        self.node = node
+        self.timeout = timeout
+        self._proc = None
+        self._lines = None
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        # 统计信息, inflight 为正在排队或执行的调用数
+        self.inflight = 0
+        self.calls = 0
+        self.errors = 0
+        self.restarts = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def _start(self):
+        self._proc = subprocess.Popen(
+            [self.node, WORKER_SCRIPT, self.module_path],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            cwd=STATIC_PATH,
+            encoding='utf-8',
+            bufsize=1,
+        )
+        self._lines = queue.Queue()
+        threading.Thread(target=self._read_stdout, args=(self._proc, self._lines), daemon=True).start()
+        logger.info(f'签名进程启动 pid: {self._proc.pid}, 脚本: {self.module_path}')
+
+    @staticmethod
+    def _read_stdout(proc, lines):
+        for line in proc.stdout:
+            lines.put(line)
+        lines.put(None)
+
+    def _kill(self):
+        if self._proc is not None:
+            try:
+                self._proc.kill()
+                self._proc.wait(timeout=1)
+            except Exception:
+                pass
+        self._proc = None
+        self._lines = None
+
+    def _roundtrip(self, req):
+        if self._proc is not None and self._proc.poll() is not None:
+            # 两次调用之间进程退出了
+            logger.warning(f'签名进程已退出, 重启: {self._proc.returncode}')
+            self._kill()
+            self.restarts += 1
+        if self._proc is None:
+            self._start()
+        self._proc.stdin.write(json_util.dumps(req) + '\n')
+        self._proc.stdin.flush()
+        while True:
+            try:
+                line = self._lines.get(timeout=self.timeout)
+            except queue.Empty:
+                raise TimeoutError(f'签名进程 {self.timeout}s 内无响应')
+            if line is None:
+                raise BrokenPipeError('签名进程已退出')
+            res = json_util.loads(line)
+            if res.get('id') == req['id']:
+                return res
+
+    def call(self, method, *args):
+        """
+            调用签名js中导出的函数, 进程异常时重启后重试一次
+        """
+        return self._request({'method': method, 'args': list(args)})
+
+    def call_batch(self, calls):
+        """
+            一次往返调用多个函数
+            :param calls: [(method, args), ...]
+            返回与 calls 顺序一致的结果列表
+        """
+        if not calls:
+            return []
+        return self._request({'batch': [{'method': method, 'args': list(args)} for method, args in calls]})
+
+    def _request(self, req):
+        req['id'] = next(self._ids)
+        with self._lock:
+            start = time.perf_counter()
+            try:
+                try:
+                    res = self._roundtrip(req)
+                except (OSError, ValueError) as e:
+                    logger.warning(f'签名进程异常, 重启: {e}')
+                    self._kill()
+                    self.restarts += 1
+                    try:
+                        res = self._roundtrip(req)
+                    except (OSError, ValueError):
+                        self._kill()
+                        raise
+            except Exception:
+                self.errors += 1
+                raise
+            finally:
+                cost = time.perf_counter() - start
+                self.calls += 1
+                self.total_time += cost
+                self.max_time = max(self.max_time, cost)
+            if 'error' in res:
+                self.errors += 1
+                raise SignWorkerError(res['error'])
+        return res['result']
+
+    def ping(self):
+        try:
+            return self.call('ping') == 'pong'
+        except Exception as e:
+            logger.warning(f'签名进程健康检查失败: {e}')
+            return False
+
+    def warmup(self, workers=1):
+        return self.ping()
+
+    @property
+    def alive(self):
+        return self._proc is not None and self._proc.poll() is None
+
+    def stats(self):
+        return {
+            'pid': self._proc.pid if self.alive else None,
+            'alive': self.alive,
+            'inflight': self.inflight,
+            'calls': self.calls,
+            'errors': self.errors,
+            'restarts': self.restarts,
+            'avg_ms': self.total_time / self.calls * 1000 if self.calls else 0.0,
+            'max_ms': self.max_time * 1000,
+        }
+
+    def close(self):
+        with self._lock:
+            self._kill()
+
+
+class SignerPool():
+    """
+        多个 SignWorker 组成的签名进程池, 每次调用分给当前负载最小的进程
+        进程在第一次被分到任务时才启动, 串行调用时只会用到一个进程
+        :param module_path: 签名js文件路径
+        :param size: 进程数量, 默认为cpu核数
+        :param health_interval: 后台健康检查间隔(秒), 为空则不启动后台检查
+    """
+    def __init__(self, module_path, size=None, node='node', timeout=10, health_interval=None):
+        size = size or os.cpu_count() or 1
+        self.workers = [SignWorker(module_path, node, timeout) for _ in range(size)]
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        if health_interval:
+            threading.Thread(target=self._health_loop, args=(health_interval,), daemon=True).start()
+
+    def _acquire(self):
+        with self._lock:
+            worker = min(self.workers, key=lambda w: w.inflight)
+            worker.inflight += 1
+        return worker
+
+    def _release(self, worker):
+        with self._lock:
+            worker.inflight -= 1
+
+    def call(self, method, *args):
+        worker = self._acquire()
+        try:
+            return worker.call(method, *args)
+        finally:
+            self._release(worker)
+
+    def call_batch(self, calls):
+        worker = self._acquire()
+        try:
+            return worker.call_batch(calls)
+        finally:
+            self._release(worker)
+
+    def health_check(self):
+        """
+            检查已启动的进程, 无响应的进程会被重启
+            返回每个进程是否健康
+        """
+        results = []
+        for worker in self.workers:
+            if not worker.alive and worker.calls == 0:
+                results.append(True)
+            else:
+                results.append(worker.ping())
+        return results
+
+    def warmup(self, workers=1):
+        """
+            预先启动前 workers 个签名进程
+        """
+        return [worker.ping() for worker in self.workers[:workers]]
+
+    def _health_loop(self, interval):
+        while not self._closed.wait(interval):
+            self.health_check()
+
+    def stats(self):
+        return [worker.stats() for worker in self.workers]
+
+    def close(self):
+        self._closed.set()
+        for worker in self.workers:
+            worker.close()
@@ -0,0 +1,80 @@
+import asyncio
+import copy
+import threading
+from xhs_utils import json_util
+
+
+def make_key(method: str, api: str, account, data=''):
+    """
+        合并请求用的 key, 同一账号对同一接口发出的相同参数的请求视为同一个请求
+        data 为字典时按 key 排序后序列化, 字段顺序不同也能合并
+    """
+    if not isinstance(data, str):
+        data = json_util.dumps(data, sort_keys=True)
+    return method, api, account, data
+
+
+class _Call():
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight():
+    """
+        合并并发的相同请求, 同一个 key 同时只有一个请求在执行, 其它线程等待并共用它的结果
+        有其它调用方共用结果时每个调用方拿到的都是深拷贝, 修改返回值不会互相影响; 请求失败时所有调用方抛出同一个异常
+    """
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.shared = 0
+
+    def do(self, key, fn, *args):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.waiters += 1
+                self.shared += 1
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+        try:
+            call.result = fn(*args)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return copy.deepcopy(call.result) if call.waiters else call.result
+
+
+class AsyncSingleFlight():
+    """
+        SingleFlight 的异步版本, 同一个 key 的协程共用一个 Task
+        发起请求的协程被取消时请求继续执行, 不影响其它等待的协程
+    """
+    def __init__(self):
+        self._calls = {}
+        self.shared = 0
+
+    async def do(self, key, fn, *args):
+        call = self._calls.get(key)
+        if call is None:
+            task = asyncio.ensure_future(fn(*args))
+            call = self._calls[key] = [task, 0]
+            task.add_done_callback(lambda done: self._calls.pop(key, None) if self._calls.get(key) is call else None)
+        else:
+            call[1] += 1
+            self.shared += 1
+        result = await asyncio.shield(call[0])
+        return copy.deepcopy(result) if call[1] else result
@@ -1,18 +1,32 @@
-import json
+import os
+import threading
+from xhs_utils import json_util
 
-import execjs
+from xhs_utils.sign_worker import SignerPool, STATIC_PATH
 
-try:
-    js = execjs.compile(open(r'../static/xhs_creator_xs.js', 'r', encoding='utf-8').read())
-except:
-    js = execjs.compile(open(r'static/xhs_creator_xs.js', 'r', encoding='utf-8').read())
+# 签名进程池在第一次使用时才创建
+sign_pool = None
+sign_pool_lock = threading.Lock()
+
+
+def get_sign_pool():
+    global sign_pool
+    if sign_pool is None:
+        with sign_pool_lock:
+            if sign_pool is None:
+                sign_pool = SignerPool(os.path.join(STATIC_PATH, 'xhs_creator_xs.js'), int(os.getenv('XHS_SIGN_POOL_SIZE', 0)) or None)
+    return sign_pool
+
+
+def warmup(workers=1):
+    get_sign_pool().warmup(workers)
 
 
 def generate_xs(a1, api, data=''):
-    ret = js.call('get_request_headers_params', api, data, a1)
+    ret = get_sign_pool().call('get_request_headers_params', api, data, a1)
     xs, xt = ret['xs'], ret['xt']
     if data:
-        data = json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+        data = json_util.dumps(data)
     return xs, xt, data
 
 
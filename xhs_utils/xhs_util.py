@@ -1,18 +1,57 @@
-import json
+import collections
+import functools
+import itertools
 import math
+import os
 import random
-import execjs
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from xhs_utils import json_util
 from xhs_utils.cookie_util import trans_cookies
+from xhs_utils.sign_worker import SignerPool, STATIC_PATH
+from xhs_utils.xhs_sign_util import PySigner
 
-try:
-    js = execjs.compile(open(r'../static/xhs_xs_xsc_56.js', 'r', encoding='utf-8').read())
-except:
-    js = execjs.compile(open(r'static/xhs_xs_xsc_56.js', 'r', encoding='utf-8').read())
+# 签名后端在第一次使用时才创建, node: 常驻node进程池 python: 进程内python实现
+SIGNER_FACTORIES = {
+    # 签名进程池大小, 默认cpu核数
+    'node': lambda: SignerPool(os.path.join(STATIC_PATH, 'xhs_xs_xsc_56.js'), int(os.getenv('XHS_SIGN_POOL_SIZE', 0)) or None),
+    'python': PySigner,
+}
+signers = {}
+signers_lock = threading.Lock()
+sign_backend = os.getenv('XHS_SIGN_BACKEND', 'node')
+execjs_ctx = None
 
-try:
-    xray_js = execjs.compile(open(r'../static/xhs_xray.js', 'r', encoding='utf-8').read())
-except:
-    xray_js = execjs.compile(open(r'static/xhs_xray.js', 'r', encoding='utf-8').read())
+# static/xhs_xray.js 中 traceId 的实现: (时间戳 << 23 | 自增序号) + 64位随机数, 均为16位hex
+XRAY_MAX_SEQ = 2 ** 23 - 1
+xray_seq = itertools.count(random.getrandbits(23))
+
+def set_sign_backend(backend):
+    global sign_backend
+    if backend not in SIGNER_FACTORIES:
+        raise ValueError(f'未知的签名后端 {backend}, 可选 {list(SIGNER_FACTORIES)}')
+    sign_backend = backend
+
+def get_signer(backend=None):
+    backend = backend or sign_backend
+    signer = signers.get(backend)
+    if signer is None:
+        with signers_lock:
+            if backend not in signers:
+                if backend not in SIGNER_FACTORIES:
+                    raise ValueError(f'未知的签名后端 {backend}, 可选 {list(SIGNER_FACTORIES)}')
+                signers[backend] = SIGNER_FACTORIES[backend]()
+            signer = signers[backend]
+    return signer
+
+def warmup(backend=None, workers=1):
+    """
+        提前创建签名后端并启动签名进程, 避免第一个请求承担冷启动
+        :param workers: 预先启动的node签名进程数量
+    """
+    get_signer(backend).warmup(workers)
 
 def generate_x_b3_traceid(len=16):
     x_b3_traceid = ""
@@ -20,18 +59,27 @@ def generate_x_b3_traceid(len=16):
         x_b3_traceid += "abcdef0123456789"[math.floor(16 * random.random())]
     return x_b3_traceid
 
-def generate_xs_xs_common(a1, api, data='', method='POST'):
-    ret = js.call('get_request_headers_params', api, data, a1, method)
+def generate_xs_xs_common(a1, api, data='', method='POST', backend=None):
+    ret = get_signer(backend).call('get_request_headers_params', api, data, a1, method)
     xs, xt, xs_common = ret['xs'], ret['xt'], ret['xs_common']
     return xs, xt, xs_common
 
 def generate_xs(a1, api, data=''):
-    ret = js.call('get_xs', api, data, a1)
+    global execjs_ctx
+    if execjs_ctx is None:
+        import execjs
+        with open(os.path.join(STATIC_PATH, 'xhs_xs_xsc_56.js'), 'r', encoding='utf-8') as f:
+            execjs_ctx = execjs.compile(f.read())
+    ret = execjs_ctx.call('get_xs', api, data, a1)
     xs, xt = ret['X-s'], ret['X-t']
     return xs, xt
 
-def generate_xray_traceid():
-    return xray_js.call('traceId')
+def generate_xray_traceid(timestamp=None):
+    if timestamp is None:
+        timestamp = int(time.time() * 1000)
+    seq = next(xray_seq) & XRAY_MAX_SEQ
+    high = ((timestamp << 23) | seq) & 0xFFFFFFFFFFFFFFFF
+    return f'{high:016x}{random.getrandbits(64):016x}'
 def get_common_headers():
     return {
         "authority": "www.xiaohongshu.com",
@@ -50,48 +98,139 @@ def get_common_headers():
         "upgrade-insecure-requests": "1",
         "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
     }
+REQUEST_HEADERS_TEMPLATE = MappingProxyType({
+    "authority": "edith.xiaohongshu.com",
+    "accept": "application/json, text/plain, */*",
+    "accept-language": "zh-CN,zh;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6",
+    "cache-control": "no-cache",
+    "content-type": "application/json;charset=UTF-8",
+    "origin": "https://www.xiaohongshu.com",
+    "pragma": "no-cache",
+    "referer": "https://www.xiaohongshu.com/",
+    "sec-ch-ua": "\"Not A(Brand\";v=\"99\", \"Microsoft Edge\";v=\"121\", \"Chromium\";v=\"121\"",
+    "sec-ch-ua-mobile": "?0",
+    "sec-ch-ua-platform": "\"Windows\"",
+    "sec-fetch-dest": "empty",
+    "sec-fetch-mode": "cors",
+    "sec-fetch-site": "same-site",
+    "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36 Edg/121.0.0.0",
+    "x-b3-traceid": "",
+    "x-mns": "unload",
+    "x-s": "",
+    "x-s-common": "",
+    "x-t": "",
+    "x-xray-traceid": ""
+})
+
 def get_request_headers_template():
-    return {
-        "authority": "edith.xiaohongshu.com",
-        "accept": "application/json, text/plain, */*",
-        "accept-language": "zh-CN,zh;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6",
-        "cache-control": "no-cache",
-        "content-type": "application/json;charset=UTF-8",
-        "origin": "https://www.xiaohongshu.com",
-        "pragma": "no-cache",
-        "referer": "https://www.xiaohongshu.com/",
-        "sec-ch-ua": "\"Not A(Brand\";v=\"99\", \"Microsoft Edge\";v=\"121\", \"Chromium\";v=\"121\"",
-        "sec-ch-ua-mobile": "?0",
-        "sec-ch-ua-platform": "\"Windows\"",
-        "sec-fetch-dest": "empty",
-        "sec-fetch-mode": "cors",
-        "sec-fetch-site": "same-site",
-        "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36 Edg/121.0.0.0",
-        "x-b3-traceid": "",
-        "x-mns": "unload",
-        "x-s": "",
-        "x-s-common": "",
-        "x-t": "",
-        "x-xray-traceid": generate_xray_traceid()
-    }
+    headers = dict(REQUEST_HEADERS_TEMPLATE)
+    headers['x-xray-traceid'] = generate_xray_traceid()
+    return headers
 
-def generate_headers(a1, api, data='', method='POST'):
-    xs, xt, xs_common = generate_xs_xs_common(a1, api, data, method)
-    x_b3_traceid = generate_x_b3_traceid()
-    headers = get_request_headers_template()
+def build_headers(xs, xt, xs_common, data='', template=REQUEST_HEADERS_TEMPLATE):
+    headers = dict(template)
     headers['x-s'] = xs
     headers['x-t'] = str(xt)
     headers['x-s-common'] = xs_common
-    headers['x-b3-traceid'] = x_b3_traceid
+    headers['x-b3-traceid'] = generate_x_b3_traceid()
+    headers['x-xray-traceid'] = generate_xray_traceid()
     if data:
-        data = json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+        data = json_util.dumps(data)
     return headers, data
 
+def generate_headers(a1, api, data='', method='POST'):
+    xs, xt, xs_common = generate_xs_xs_common(a1, api, data, method)
+    return build_headers(xs, xt, xs_common, data)
+
+class XhsSession():
+    """
+        一个账号的会话, 每个cookies字符串只解析一次
+        持有解析好的cookies, a1, 不可变的请求头模板和签名后端, XHS_Apis 的 cookies_str 参数都可以传入它
+        :param cookies_str: 你的cookies
+        :param backend: 签名后端, 为空时使用当前默认后端
+    """
+    def __init__(self, cookies_str: str, backend=None):
+        self.cookies_str = cookies_str
+        self.cookies = trans_cookies(cookies_str)
+        self.cookie_header = '; '.join(f'{k}={v}' for k, v in self.cookies.items())
+        self.a1 = self.cookies['a1']
+        self.backend = backend or sign_backend
+        self.signer = get_signer(self.backend)
+        self.headers_template = REQUEST_HEADERS_TEMPLATE
+
+    def generate_request_params(self, api, data='', method='POST'):
+        ret = self.signer.call('get_request_headers_params', api, data, self.a1, method)
+        headers, data = build_headers(ret['xs'], ret['xt'], ret['xs_common'], data, self.headers_template)
+        return headers, self.cookies, data
+
+    def generate_request_params_batch(self, request_list):
+        calls = [('get_request_headers_params', [api, data, self.a1, method]) for api, data, method in request_list]
+        rets = self.signer.call_batch(calls)
+        request_params = []
+        for (api, data, method), ret in zip(request_list, rets):
+            headers, trans_data = build_headers(ret['xs'], ret['xt'], ret['xs_common'], data, self.headers_template)
+            request_params.append((headers, self.cookies, trans_data))
+        return request_params
+
+    def __repr__(self):
+        return f'XhsSession(a1={self.a1!r}, backend={self.backend!r})'
+
+@functools.lru_cache(maxsize=1024)
+def _get_cached_session(cookies_str, backend):
+    return XhsSession(cookies_str, backend)
+
+def get_session(cookies_str, backend=None):
+    """
+        返回cookies对应的 XhsSession, 同一个cookies字符串复用同一个会话
+    """
+    if isinstance(cookies_str, XhsSession):
+        return cookies_str
+    return _get_cached_session(cookies_str, backend or sign_backend)
+
 def generate_request_params(cookies_str, api, data='', method='POST'):
-    cookies = trans_cookies(cookies_str)
-    a1 = cookies['a1']
-    headers, data = generate_headers(a1, api, data, method)
-    return headers, cookies, data
+    return get_session(cookies_str).generate_request_params(api, data, method)
+
+def generate_request_params_batch(cookies_str, request_list, backend=None):
+    """
+        一次签名多个请求, 只和签名后端往返一次
+        :param request_list: [(api, data, method), ...]
+        返回与 request_list 顺序一致的 [(headers, cookies, data), ...]
+    """
+    return get_session(cookies_str, backend).generate_request_params_batch(request_list)
+
+class PreSignQueue():
+    """
+        预签名队列, 在后台线程中提前签好后续的请求, 当前请求返回时下一页的参数已经就绪
+        put 放入一批 (api, data, method), get 按放入顺序取出 (headers, cookies, data)
+        调用方暂停(例如下游处理不过来, 或者限速等待)后签名可能已经过期, get 时超过 max_age 秒的重新签名
+        :param max_age: 预签名的有效时间(秒)
+    """
+    def __init__(self, cookies_str, backend=None, max_age=5):
+        self.cookies_str = cookies_str
+        self.backend = backend
+        self.max_age = max_age
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._pending = collections.deque()
+        self._ready = collections.deque()
+
+    def _sign(self, request_list):
+        request_params = generate_request_params_batch(self.cookies_str, request_list, self.backend)
+        signed_at = time.monotonic()
+        return [(request, params, signed_at) for request, params in zip(request_list, request_params)]
+
+    def put(self, request_list):
+        self._pending.append(self._executor.submit(self._sign, request_list))
+
+    def get(self):
+        while not self._ready:
+            self._ready.extend(self._pending.popleft().result())
+        (api, data, method), params, signed_at = self._ready.popleft()
+        if time.monotonic() - signed_at > self.max_age:
+            params = get_session(self.cookies_str, self.backend).generate_request_params(api, data, method)
+        return params
+
+    def close(self):
+        self._executor.shutdown(wait=False)
 
 def splice_str(api, params):
     url = api + '?'